@@ -24,5 +24,6 @@ python3 -m pip install -r REQUIREMENTS.txt
 mkdir /opt/LDV-plotter
 cp -r ./images ./scripts ./stylesheets ./venv /opt/LDV-plotter/
 cp ./root/bin/ldv-plt /bin/ldv-plt
+cp ./root/bin/ldv-plt-batch /bin/ldv-plt-batch
 cp ./root/usr/share/applications/LDV-plotter.desktop /usr/share/applications/LDV-plotter.desktop
 
@@ -16,4 +16,4 @@
 #     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
 
 rm -r /opt/LDV-plotter
-rm /bin/ldv-plt /usr/share/applications/LDV-plotter.desktop
+rm /bin/ldv-plt /bin/ldv-plt-batch /usr/share/applications/LDV-plotter.desktop
@@ -0,0 +1,242 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"""Headless benchmarks of evaluation, plot jobs, x grid, project files and rendering.
+
+    python3 benchmarks/bench.py run -o results.json [--quick]
+    python3 benchmarks/bench.py compare baseline.json results.json
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+sys.path.insert(0, SCRIPTS)
+
+import numpy
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+import compiler
+import func_generator
+from grid import build_x
+from composition import FunctionTable
+from workers import PlotJob, StreamingPlotJob
+from parallel import ParallelEvaluator, DEFAULT_WORKERS
+from project import Project, read_project, write_project
+
+EXPRESSIONS = {
+    "polynomial": "3*pow(x, 3) - 2*x**2 + x/7 - 5",
+    "trig": "sin(cos(sin(x)) * x) + cos(sin(x/3)) * sin(x)**2",
+    "domain": "log(x - 50) + sqrt(25 - x) + 1/(x - 10)",
+}
+
+POINTS = (10**3, 10**4, 10**5, 10**6, 10**7)
+QUICK_POINTS = (10**3, 10**4, 10**5)
+FUNCS = (1, 10, 50)
+
+# The scalar engine needs seconds above this
+SCALAR_MAX_POINTS = 10**5
+
+# Plot jobs: the canvas width in pixels, and the most samples of a run
+PLOT_WIDTH = 1000
+PLOT_MAX_SAMPLES = 10**8
+
+MIN_TIME = 0.2
+MAX_REPEATS = 5
+
+def measure(function):
+    times = []
+    while len(times) < MAX_REPEATS and sum(times) < MIN_TIME:
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+
+    return {"min": min(times), "median": statistics.median(times),
+            "repeats": len(times)}
+
+def bench_evaluation(points):
+    for name, string in EXPRESSIONS.items():
+        for n_points in points:
+            xs = build_x(0, 100, n_points)
+            yield "evaluate.vectorized", {"expression": name, "points": n_points}, \
+                lambda: func_generator.evaluate(string, xs)
+
+            if n_points <= SCALAR_MAX_POINTS:
+                yield "evaluate.scalar", {"expression": name, "points": n_points}, \
+                    lambda: func_generator.evaluate_scalar(string, xs)
+
+def make_table(n_funcs):
+    # Rows like the GUI ones: every third function calls the previous one
+    strings = list(EXPRESSIONS.values())
+    rows = []
+    for i in range(n_funcs):
+        string = strings[i % len(strings)]
+        if i % 3 == 2: string = f"2*f{i}(x) + {string}"
+        rows.append((f"f{i+1}(x)", string))
+
+    return FunctionTable(rows), [string for _, string in rows]
+
+def run_job(job, table):
+    job.table = table
+    job.run()
+
+def bench_plot_jobs(points, evaluators):
+    # The jobs the GUI runs: uniform grids, then streamed decimated curves,
+    # serially and on the process pool
+    for n_funcs in FUNCS:
+        table, strings = make_table(n_funcs)
+        for n_points in points[:3]:
+            xs = build_x(0, 100, n_points)
+            yield "plot.uniform", {"funcs": n_funcs, "points": n_points}, \
+                lambda: run_job(PlotJob(strings, xs), table)
+
+        for n_points in points[2:]:
+            if n_funcs * n_points > PLOT_MAX_SAMPLES: continue
+            for evaluator in evaluators:
+                params = {"funcs": n_funcs, "points": n_points, "workers": evaluator.workers}
+                yield "plot.streaming", params, lambda: run_job(StreamingPlotJob(
+                    strings, (0.0, 100.0, n_points), PLOT_WIDTH, evaluator), table)
+
+def bench_compilation():
+    def compile_uncached():
+        compiler.EXPRESSION_CACHE.clear()
+        for string in EXPRESSIONS.values():
+            compiler.compile_expr(string)
+
+    yield "compile", {"expressions": len(EXPRESSIONS)}, compile_uncached
+
+def bench_grid(points):
+    for n_points in points:
+        yield "grid.build_x", {"points": n_points}, lambda: build_x(-50, 50, n_points)
+
+def make_project(n_funcs, n_points=1000):
+    strings = list(EXPRESSIONS.values())
+    funcs = [(f"f{i+1}(x)", strings[i % len(strings)]) for i in range(n_funcs)]
+    return Project(funcs, (0.0, 100.0, n_points))
+
+def bench_files(directory):
+    for n_funcs in FUNCS:
+        filename = os.path.join(directory, f"project_{n_funcs}")
+        project = make_project(n_funcs)
+        yield "project.write", {"funcs": n_funcs}, lambda: write_project(filename, project)
+        yield "project.read", {"funcs": n_funcs}, lambda: read_project(filename)
+
+def render(lines):
+    figure = Figure()
+    canvas = FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    for xs, ys in lines:
+        ax.plot(xs, ys)
+    canvas.draw()
+
+def bench_rendering(points):
+    for n_funcs in FUNCS:
+        for n_points in points[:3]:
+            xs = build_x(0, 100, n_points)
+            lines = [(xs, numpy.sin(xs * (i + 1))) for i in range(n_funcs)]
+            yield "render.agg", {"funcs": n_funcs, "points": n_points}, \
+                lambda: render(lines)
+
+def all_benchmarks(points, directory, evaluators):
+    yield from bench_compilation()
+    yield from bench_evaluation(points)
+    yield from bench_plot_jobs(points, evaluators)
+    yield from bench_grid(points)
+    yield from bench_files(directory)
+    yield from bench_rendering(points)
+
+def run(points):
+    results = []
+    evaluators = [ParallelEvaluator(workers) for workers in sorted({1, DEFAULT_WORKERS})]
+    with tempfile.TemporaryDirectory() as directory:
+        for name, params, function in all_benchmarks(points, directory, evaluators):
+            result = {"name": name, "params": params, **measure(function)}
+            print(f"{key(result):60} {result['median'] * 1000:10.3f} ms", file=sys.stderr)
+            results.append(result)
+
+    for evaluator in evaluators:
+        evaluator.shutdown()
+    return results
+
+def metadata():
+    import matplotlib
+    return {"python": platform.python_version(), "numpy": numpy.__version__,
+            "matplotlib": matplotlib.__version__, "machine": platform.machine(),
+            "system": platform.system(), "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def key(result):
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+def compare(baseline, current, threshold):
+    # The regressions, as (key, baseline median, current median) tuples
+    old = {key(result): result["median"] for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        name = key(result)
+        if name in old and result["median"] > old[name] * (1 + threshold):
+            regressions.append((name, old[name], result["median"]))
+
+    return regressions
+
+def load(filename):
+    with open(filename) as file:
+        return json.load(file)
+
+def command_run(args):
+    report = {"meta": metadata(), "results": run(QUICK_POINTS if args.quick else POINTS)}
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=1)
+
+    return 0
+
+def command_compare(args):
+    regressions = compare(load(args.baseline), load(args.current), args.threshold)
+    for name, old, new in regressions:
+        print(f"REGRESSION {name}: {old * 1000:.3f} ms -> {new * 1000:.3f} ms "
+              f"(+{(new / old - 1) * 100:.0f}%)")
+
+    print(f"{len(regressions)} regressions over {args.threshold * 100:.0f}%")
+    return 1 if regressions else 0
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="LDV-plotter benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("-o", "--output", default="bench_results.json")
+    run_parser.add_argument("--quick", action="store_true", help="up to 1e5 points")
+    run_parser.set_defaults(function=command_run)
+
+    compare_parser = commands.add_parser("compare", help="compare two runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("-t", "--threshold", type=float, default=0.10)
+    compare_parser.set_defaults(function=command_compare)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    sys.exit(args.function(args))
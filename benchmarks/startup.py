@@ -0,0 +1,75 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"""Time from launching GUI.py to its first interactive frame.
+
+    python3 benchmarks/startup.py [-n 10] [-o startup.json]
+
+Set QT_QPA_PLATFORM=offscreen to run it without a display.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+GUI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                   "scripts", "GUI.py")
+TARGET = 0.3
+TIMEOUT = 30
+
+def measure_once():
+    env = dict(os.environ, LDV_PLT_STARTUP_BENCH="1")
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, GUI], env=env, text=True,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        for line in process.stdout:
+            if line.strip() == "first frame":
+                return time.perf_counter() - started
+        raise RuntimeError("GUI.py exited before showing its first frame")
+
+    finally:
+        process.kill()
+        process.wait(TIMEOUT)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="LDV-plotter startup benchmark")
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    parser.add_argument("-o", "--output", help="write the results as JSON")
+    parser.add_argument("-t", "--target", type=float, default=TARGET,
+                        help="seconds, default %(default)s")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    times = [measure_once() for _ in range(args.runs)]
+    median = statistics.median(times)
+    print(f"first frame: median {median * 1000:.0f} ms, "
+          f"min {min(times) * 1000:.0f} ms over {len(times)} runs "
+          f"(target {args.target * 1000:.0f} ms)")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"times": times, "median": median, "target": args.target}, file)
+    return 0 if median <= args.target else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
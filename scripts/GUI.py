@@ -17,40 +17,93 @@
 
 import os
 import sys
-import matplotlib.pyplot as plt
 
 from PySide2 import QtWidgets, QtCore, QtGui
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
 from layouts import MainLayout
-from costum_widgets import AppFunc
-import func_generator
+from costum_widgets import AppFunc, AppParam, AppDataset
+import implicit
+import decimation
+from grid import XGrid
+from workers import PlotJob, AdaptivePlotJob, StreamingPlotJob, DatasetJob, ExportJob
+from parallel import ParallelEvaluator
+from viewport import ViewportResampler
+from crosshair import Crosshair
+from plot_model import PlotModel
+from project import Project, InvalidProjectError, write_project, dataset_path
+from binary_project import BINARY_EXTENSION, read_project_file, write_binary_project
+from instrumentation import TRACER
+from disk_cache import DiskCache
+from composition import FunctionTable, EMPTY_TABLE, function_name, called_names, rename_calls
+from sweep import parse_parameters
+from analysis import export_csv
+from export import Exporter, get_format, format_throughput
+
+# How roots, minima and maxima are marked on the plot
+ANALYSIS_MARKERS = {"root": "o", "minimum": "v", "maximum": "^"}
+
+EXPORT_FILTERS = "CSV (*.csv);;NumPy array (*.npy);;Columns (*.ldvc)"
 
 from pathlib import Path
 home = str(Path.home())
 os.chdir(home)
 
-class NoStepsError(Exception): pass
+# Live preview: a coarse pass on this many points, then the full one
+PREVIEW_POINTS = 256
+PREVIEW_DEBOUNCE_MS = 60
 
-FUNCS_EXECUTION_ERRORS = (
-    ArithmeticError,
-    SyntaxError,
-    NameError,
-    NoStepsError)
+# Names given to the new parameters, the first one not in use
+PARAM_NAMES = "abcdkmnpqrstuvw"
 
 class MainWindow(QtWidgets.QWidget):
+    first_frame = QtCore.Signal()
+
     def __init__(self, filename=None):
         QtWidgets.QWidget.__init__(self)
+        self.first_frame_shown = False
         self.set_filename(filename)
         self.setup_win_style()
         self.setup_layout()
         self.setup_file()
 
+    def showEvent(self, event):
+        QtWidgets.QWidget.showEvent(self, event)
+        if not self.first_frame_shown:
+            self.first_frame_shown = True
+            QtCore.QTimer.singleShot(0, self.on_first_frame)
+
+    def on_first_frame(self):
+        # The editor is usable from here: now load the plotting stack
+        self.first_frame.emit()
+        self.main_layout.load_plotting()
+
     def setup_layout(self):
         self.app_funcs = []
+        self.app_params = []
+        self.app_datasets = []
+        self.x_grid = XGrid()
+        self.thread_pool = QtCore.QThreadPool()
+        self.plot_job = None
+        self.plot_jobs = set()
+        self.export_job = None
+        self.profile_filename = None
+        self.disk_cache = DiskCache()
+        self.evaluator = ParallelEvaluator()
         self.main_layout = MainLayout(self)
         self.setLayout(self.main_layout)
+        self.viewport = ViewportResampler(self.main_layout, self.thread_pool)
+        self.crosshair = Crosshair(self.main_layout)
+        self.plot_model = PlotModel(self.main_layout, self.viewport, self.crosshair)
+        self.preview_timer = self.create_preview_timer()
+        self.analyses = []
+        self.analysis_markers = []
+
+    def create_preview_timer(self):
+        timer = QtCore.QTimer()
+        timer.setSingleShot(True)
+        timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        timer.timeout.connect(self.preview)
+        return timer
 
     def setup_file(self):
         if not self.filename:
@@ -73,8 +126,14 @@ class MainWindow(QtWidgets.QWidget):
         icon = QtGui.QIcon(f"{installationfolder}/images/icon.png")
         self.setWindowIcon(icon)
 
-    def new_file(self):
+    def reset_ui(self):
+        self.cancel_plot()
+        self.analyses, self.analysis_markers = [], []
         self.main_layout.reset_ui()
+        self.plot_model.reset()
+
+    def new_file(self):
+        self.reset_ui()
         self.set_filename(None)
         self.clear_app_funcs()
         self.create_new_func()
@@ -84,77 +143,75 @@ class MainWindow(QtWidgets.QWidget):
             filename = QtWidgets.QFileDialog.getOpenFileName(self, "Open File")[0]
             if not filename: return 0
 
-        self.main_layout.reset_ui()
+        self.reset_ui()
         self.set_filename(filename)
         self.clear_app_funcs()
         self.parse_file()
 
     def parse_file(self):
         try:
-            file = open(self.filename)
-            for line in file:
-                self.parse_file_line(line)
-
-        except IndexError:
-            file.close()
-            self.alert_invalid_file(line)
-
-    def parse_file_line(self, line):
-        name = line.split("=")[0].strip()
-        context = line.split("=")[1].strip()
-        print(line)
-        if name in ("start", "end", "n_points"):
-            self.set_x_range(name, context)
-        else:
+            with TRACER.span("read project", file=self.filename):
+                project, curves = read_project_file(self.filename)
+        except InvalidProjectError as error:
+            self.alert_invalid_file(error.line)
+            return
+
+        for name, context in project.funcs:
             self.create_new_func(name, context)
+        for name, context in project.params:
+            self.create_new_param(name, context)
+        for reference in project.datasets:
+            self.add_dataset(dataset_path(self.filename, reference))
+        self.main_layout.set_x_settings(project.x_settings)
+        self.main_layout.set_y_range(project.y_range)
+        self.show_saved_curves(curves)
+
+    def show_saved_curves(self, curves):
+        # Binary projects come with memory-mapped samples: nothing to evaluate
+        if not curves: return
 
-    def set_x_range(self, name, context):
-        x_settings = list(self.main_layout.get_x_settings())
-        if name == "start":
-            x_settings[0] = context
-        elif name == "end":
-            x_settings[1] = context
-        elif name == "n_points":
-            x_settings[2] = context
-        else:
-            raise Exception
-        self.main_layout.set_x_settings(x_settings)
+        try:
+            table = self.create_table()
+        except ValueError:
+            table = EMPTY_TABLE
+
+        for index, fingerprint, xs, ys in curves:
+            app_func = self.app_funcs[index]
+            self.plot_model.update(app_func, fingerprint, xs, ys,
+                                   app_func.get_definition(), table)
+        self.plot_model.autoscale()
+        self.refresh_plot()
 
-            
     def alert_invalid_file(self, line):
         alrt = QtWidgets.QMessageBox()
         alrt.setWindowTitle("Failed to open the file")
         alrt.setText(f"The file is invalid:\n{line}")
         alrt.exec_()
-    
-    def get_x_settings(self):
-        settings = self.main_layout.get_x_settings()
-        names = ("start", "end", "n_points")
-        string = ""
-        i = 0
-        while i < 3:
-            string += names[i]+"="+str(settings[i])+"\n"
-            i+=1
-
-        return string
 
     def save_file(self):
         if not self.filename:
             self.save_file_as()
             return 0
 
-        context = self.read_app_funcs_context()
-        context += self.get_x_settings()
-
-        with open(self.filename, "w") as file:
-            file.write(context)
+        with TRACER.span("write project", file=self.filename):
+            if self.filename.endswith(BINARY_EXTENSION):
+                write_binary_project(self.filename, self.get_project(),
+                                     self.get_saved_curves())
+            else:
+                write_project(self.filename, self.get_project())
 
-    def read_app_funcs_context(self):
-        context = ""
-        for foo in self.get_funcs():
-            context += foo.get_name() + "=" + foo.get_text() + "\n"
+    def get_saved_curves(self):
+        # A plot which was running when its row was deleted may add it back
+        return [(self.app_funcs.index(app_func), entry.fingerprint,
+                 entry.curve.xs, entry.curve.ys)
+                for app_func, entry in self.plot_model.entries.items()
+                if app_func in self.app_funcs]
 
-        return context
+    def get_project(self):
+        funcs = [(foo.get_name(), foo.get_definition()) for foo in self.get_funcs()]
+        return Project(funcs, self.main_layout.get_x_settings(), self.get_params(),
+                       self.main_layout.get_y_range(),
+                       [dataset.get_filename() for dataset in self.app_datasets])
 
     def save_file_as(self, filename=None):
         if not filename:
@@ -164,34 +221,288 @@ class MainWindow(QtWidgets.QWidget):
         self.set_filename(filename)
         self.save_file()
 
-    def create_x(self):
-        start, end, step = self.main_layout.get_x_range()
-        count = start
-
-        # Count from start to end
-        while abs(count) < abs(end + step/2):
-            yield count
-            count += step
+    def create_x(self, settings):
+        with TRACER.span("x grid"):
+            return self.x_grid.get(*settings)
 
     def plot(self):
-        self.main_layout.clear_plt()
-        ax = self.main_layout.create_ax()
+        self.start_plot(self.get_plot_fingerprint())
+
+    def schedule_preview(self):
+        # Whatever is running is out of date as soon as the text changes
+        if not self.main_layout.is_live_preview(): return
+        self.cancel_plot()
+        self.preview_timer.start()
+
+    def preview(self):
+        # Only the functions whose full curve is out of date get a coarse pass
+        fingerprint = self.get_plot_fingerprint()
+        settings = fingerprint[0]
+        coarse = ((*settings[:2], min(settings[2], PREVIEW_POINTS)), "uniform", None)
+        self.start_plot(fingerprint, coarse, quiet=True)
+
+    def start_plot(self, fingerprint, pass_fingerprint=None, quiet=False):
+        self.cancel_plot()
+        TRACER.reset_plot()
+        with TRACER.span("compile"):
+            table = self.get_table(quiet)
+            if table is None: return
+            compiled = self.compile_funcs(table.names, quiet)
+
+        dirty = self.plot_model.select_dirty(compiled, self.fingerprinter(table, fingerprint))
+        job = self.create_plot_job([string for _, string in dirty],
+                                   pass_fingerprint or fingerprint)
+        self.setup_plot_job(job, dirty, table, pass_fingerprint or fingerprint)
+        job.quiet, job.coarse = quiet, pass_fingerprint is not None
+        if job.coarse: job.cache = None
+
+        self.plot_job = job
+        self.plot_jobs.add(job)
+        self.thread_pool.start(job)
+
+    def fingerprinter(self, table, fingerprint):
+        # The fingerprint of every curve; 2-D functions depend on the y range too
+        y_fingerprint = (*fingerprint, self.main_layout.get_y_range())
+        return lambda string: (table.signature(string),
+                               y_fingerprint if implicit.is_2d(string) else fingerprint)
+
+    def setup_plot_job(self, job, dirty, table, fingerprint):
+        get_fingerprint = self.fingerprinter(table, fingerprint)
+        job.app_funcs = [app_func for app_func, _ in dirty]
+        job.fingerprints = [get_fingerprint(string) for _, string in dirty]
+        job.table, job.y_range = table, self.main_layout.get_y_range()
+        job.profile_filename, self.profile_filename = self.profile_filename, None
+        job.cache = self.disk_cache
+        job.signals.progress.connect(self.plot_progress)
+        job.signals.finished.connect(self.plot_finished)
+
+    def create_table(self):
+        funcs = [(foo.get_name(), foo.get_text()) for foo in self.get_funcs()]
+        return FunctionTable(funcs, parse_parameters(self.get_params()))
+
+    def get_table(self, quiet=False):
+        # Bad ranges and functions calling each other in circle
+        try:
+            return self.create_table()
+        except ValueError as error:
+            if quiet: return None
+            alrt = QtWidgets.QMessageBox()
+            alrt.setWindowTitle("Failed to evaluate the expressions")
+            alrt.setText(f"Your definitions are wrong:\n {error}")
+            alrt.exec_()
+
+    def get_sampling_mode(self):
+        settings = self.main_layout.get_x_settings()
+        if self.main_layout.is_adaptive():
+            return "adaptive"
+        if decimation.is_worth(settings[2], self.main_layout.get_canvas_width()):
+            return "streaming"
+        return "uniform"
+
+    def get_plot_fingerprint(self):
+        mode = self.get_sampling_mode()
+        return self.main_layout.get_x_settings(), mode, self.get_canvas_size(mode)
+
+    def get_canvas_size(self, mode):
+        if mode == "adaptive":
+            return self.main_layout.get_canvas_height()
+        if mode == "streaming":
+            return self.main_layout.get_canvas_width()
+
+    def create_plot_job(self, strings, fingerprint):
+        settings, mode, size = fingerprint
+        if mode == "adaptive":
+            return AdaptivePlotJob(strings, settings, size)
+        if mode == "streaming":
+            return StreamingPlotJob(strings, settings, size, self.evaluator)
+
+        return PlotJob(strings, self.create_x(settings))
+
+    def cancel_plot(self):
+        if self.plot_job:
+            self.plot_job.cancel()
+            self.plot_job = None
+            self.main_layout.set_progress(0)
+
+    def set_workers(self, workers):
+        # Running jobs keep the old evaluator until they finish
+        self.evaluator.shutdown()
+        self.evaluator = ParallelEvaluator(workers)
+
+    def plot_progress(self, job, value):
+        if job is self.plot_job:
+            self.main_layout.set_progress(value)
+
+    def plot_finished(self, job, results):
+        # The job is kept alive until here, a cancelled one too
+        self.plot_jobs.discard(job)
+        if job is not self.plot_job: return
+
+        self.plot_job = None
+        self.draw_results(job, results)
+        if job.coarse:
+            self.start_plot(self.get_plot_fingerprint(), quiet=True)
+
+    def draw_results(self, job, results):
+        with TRACER.span("artists", functions=len(results)):
+            self.update_plot_model(job, results)
+        self.refresh_plot()
+
+    def refresh_plot(self):
+        curves = self.plot_model.get_curves()
+        self.viewport.set_curves(curves)
+        self.crosshair.set_curves(self.plot_model.get_named_curves())
+        self.main_layout.set_samples_count(sum(c.ys.size for c in curves))
+        with TRACER.span("draw"):
+            self.main_layout.update_canvas()
+        self.main_layout.set_timings(TRACER.summary())
+
+    def update_plot_model(self, job, results):
+        for app_func, string, fingerprint, (xs, data, error) in \
+                zip(job.app_funcs, job.strings, job.fingerprints, results):
+            if error:
+                self.plot_model.remove(app_func)
+                if not job.quiet: self.alert_failed_func(app_func, error)
+            else:
+                self.plot_model.update(app_func, fingerprint, xs, data, string, job.table)
+
+        if job.strings: self.clear_analysis_markers()
+        self.plot_model.autoscale()
+
+    def show_timings(self, shown):
+        self.main_layout.show_timings(shown)
+
+    def analyze(self):
+        # On the samples already plotted, refined with a few more evaluations
+        with TRACER.span("analysis"):
+            self.analyses = [(name, found) for name, found in
+                             ((name, curve.analyze()) for name, curve in
+                              self.plot_model.get_named_curves()) if found]
+        self.main_layout.get_analysis_panel().set_analyses(self.analyses)
+        self.mark_analysis(self.main_layout.get_analysis_panel().is_marked())
+
+    def mark_analysis(self, marked):
+        self.clear_analysis_markers()
+        if marked:
+            self.analysis_markers = [self.add_marker(kind, xs, ys)
+                                     for _, found in self.analyses
+                                     for kind, xs, ys in found.points()]
+        self.main_layout.get_blitter().update_curves()
+
+    def add_marker(self, kind, xs, ys):
+        return self.plot_model.get_ax().plot(xs, ys, ANALYSIS_MARKERS[kind], color="black",
+                                             markersize=5, animated=True)[0]
+
+    def clear_analysis_markers(self):
+        for marker in self.analysis_markers:
+            marker.remove()
+        self.analysis_markers = []
+
+    def export_analysis(self, filename=None):
+        if not filename:
+            filename = QtWidgets.QFileDialog.getSaveFileName(self, "Export analysis")[0]
+            if not filename: return 0
+
+        export_csv(filename, self.analyses)
 
+    def export_samples(self, filename=None):
+        if not filename:
+            filename = QtWidgets.QFileDialog.getSaveFileName(self, "Export samples", "",
+                                                             EXPORT_FILTERS)[0]
+            if not filename: return 0
+
+        table = self.get_table()
+        if table is None: return 0
+        functions = [(app_func.get_name(), string) for app_func, string in
+                     self.compile_funcs(table.names) if not implicit.is_2d(string)]
+        self.start_export(Exporter(functions, table, self.main_layout.get_x_settings()),
+                          filename)
+
+    def start_export(self, exporter, filename):
+        # One export at a time, on the x settings of the tools
+        if self.export_job: self.export_job.cancel()
+        job = ExportJob(exporter, filename, get_format(filename))
+        job.signals.progress.connect(self.export_progress)
+        job.signals.finished.connect(self.export_finished)
+        self.export_job = job
+        self.plot_jobs.add(job)
+        self.thread_pool.start(job)
+
+    def export_progress(self, job, rows, total, seconds):
+        if job is self.export_job:
+            self.main_layout.set_progress(int(100 * rows / max(total, 1)),
+                                          f"%p% · {format_throughput(rows, seconds)}")
+
+    def export_finished(self, job, error):
+        self.plot_jobs.discard(job)
+        if job is not self.export_job: return
+
+        self.export_job = None
+        exporter = job.exporter
+        self.main_layout.set_progress(
+            100, f"exported {format_throughput(exporter.rows, exporter.seconds)}")
+        if error or exporter.errors:
+            self.alert_failed_export(error, exporter.errors)
+
+    def alert_failed_export(self, error, errors):
+        failed = [f"{name}: {failure}" for name, failure in errors.items()]
+        alrt = QtWidgets.QMessageBox()
+        alrt.setWindowTitle("Failed to export the samples")
+        alrt.setText("\n".join([str(error)] if error else
+                                ["These columns are nan from where the functions failed:", *failed]))
+        alrt.exec_()
+
+    def show_crosshair(self, shown):
+        self.crosshair.set_enabled(shown)
+
+    def show_cache_stats(self):
+        stats = self.disk_cache.stats()
+        alrt = QtWidgets.QMessageBox()
+        alrt.setWindowTitle("Curves cache")
+        alrt.setText(f"{stats['hits']} hits, {stats['misses']} misses "
+                     f"({stats['hit_rate']:.0%} hit rate)\n"
+                     f"{stats['entries']} curves, {stats['bytes'] / 2**20:.1f} MiB "
+                     f"of {stats['max_bytes'] / 2**20:.0f} MiB\n{stats['directory']}")
+        alrt.exec_()
+
+    def clear_cache(self):
+        self.disk_cache.clear()
+
+    def export_trace(self, filename=None):
+        if not filename:
+            filename = QtWidgets.QFileDialog.getSaveFileName(self, "Export trace")[0]
+            if not filename: return 0
+
+        TRACER.export(filename)
+
+    def profile_next_plot(self, filename=None):
+        if not filename:
+            filename = QtWidgets.QFileDialog.getSaveFileName(self, "Save profile")[0]
+            if not filename: return 0
+
+        self.profile_filename = filename
+
+    def compile_funcs(self, names=frozenset(), quiet=False):
+        compiled, operations = [], []
         for app_func in self.get_funcs():
             string = app_func.get_text()
             if not string: continue
 
-            foo = func_generator.generate_func(string)
             try:
-                data = [foo(i) for i in self.create_x()]
-
-            except FUNCS_EXECUTION_ERRORS as error:
-                self.alert_failed_func(app_func, error)
-
+                operations.append(implicit.count_operations(string, names))
+            except (SyntaxError, NameError) as error:
+                if not quiet: self.alert_failed_func(app_func, error)
             else:
-                ax.plot(list(self.create_x()), data)
+                compiled.append((app_func, self.get_plotted(app_func, string)))
 
-        self.main_layout.update_canvas()
+        TRACER.count_operations(sum(before for before, _ in operations),
+                                sum(after for _, after in operations))
+        return compiled
+
+    def get_plotted(self, app_func, string):
+        # 2-D functions have no derivative curves
+        if implicit.is_2d(string): return string
+        return app_func.get_definition()
 
     def alert_failed_func(self, app_func, error):
         alrt = QtWidgets.QMessageBox()
@@ -204,28 +515,119 @@ class MainWindow(QtWidgets.QWidget):
             name = f"f{len(self.app_funcs)+1}(x)"
 
         func = AppFunc(name, self)
-        func.set_text(context)
+        func.set_definition(context)
         self.main_layout.add_app_func(func)
         self.app_funcs.append(func)
         func.focus()
 
     def clear_app_funcs(self):
         for f in self.get_funcs()[:]:
-            self.delete_func(f)
+            f.delete()
+        for param in self.app_params[:]:
+            param.delete()
+        for dataset in self.app_datasets[:]:
+            dataset.delete()
+
+    def create_new_param(self, name="", context=""):
+        if not name:
+            used = {param.get_name() for param in self.app_params}
+            name = next((n for n in PARAM_NAMES if n not in used), f"p{len(used)}")
+
+        param = AppParam(name, self)
+        param.set_text(context)
+        self.main_layout.add_app_func(param)
+        self.app_params.append(param)
+        param.focus()
+
+    def get_params(self):
+        return [(param.get_name(), param.get_text()) for param in self.app_params]
+
+    def remove_from_app_params_list(self, app_param):
+        self.app_params.remove(app_param)
+        self.schedule_preview()
+
+    def import_dataset(self, filename=None):
+        if not filename:
+            filename = QtWidgets.QFileDialog.getOpenFileName(self, "Import dataset")[0]
+            if not filename: return 0
+
+        self.add_dataset(filename)
+
+    def add_dataset(self, filename):
+        # Loaded in the background: CSV files may take a while to parse
+        app_dataset = AppDataset(filename, self)
+        self.main_layout.add_app_func(app_dataset)
+        self.app_datasets.append(app_dataset)
+
+        job = DatasetJob(filename, self.main_layout.get_canvas_width())
+        job.app_dataset = app_dataset
+        job.signals.finished.connect(self.dataset_loaded)
+        self.plot_jobs.add(job)
+        self.thread_pool.start(job)
+
+    def dataset_loaded(self, job, result):
+        self.plot_jobs.discard(job)
+        if job.app_dataset not in self.app_datasets: return
+
+        dataset, xs, ys, error = result
+        if error:
+            job.app_dataset.delete()
+            self.alert_invalid_dataset(error)
+            return
+
+        self.plot_model.set_dataset(job.app_dataset, dataset, xs, ys)
+        self.plot_model.autoscale()
+        self.refresh_plot()
+
+    def alert_invalid_dataset(self, error):
+        alrt = QtWidgets.QMessageBox()
+        alrt.setWindowTitle("Failed to import the dataset")
+        alrt.setText(f"The dataset is invalid:\n{error}")
+        alrt.exec_()
+
+    def remove_from_app_datasets_list(self, app_dataset):
+        self.app_datasets.remove(app_dataset)
+        if app_dataset in self.plot_model.datasets:
+            self.plot_model.remove_dataset(app_dataset)
+            self.refresh_plot()
 
     def delete_func(self, foo):
-        foo.delete()
+        # Rows calling foo would call nothing, or another row once renamed
+        name = function_name(foo.get_name())
+        callers = [f.get_name() for f in self.app_funcs
+                   if f is not foo and name in called_names(f.get_text())]
+        if callers:
+            self.alert_called_func(foo, callers)
+        else:
+            foo.delete()
+
+    def alert_called_func(self, app_func, callers):
+        alrt = QtWidgets.QMessageBox()
+        alrt.setWindowTitle("Failed to delete the function")
+        alrt.setText(f"{app_func.get_name()} is called by {', '.join(callers)}")
+        alrt.exec_()
 
     def get_funcs(self):
         return self.app_funcs
 
     def update_funcs_names(self):
+        # The calls follow the rows to their new names
+        renames = {}
         for count, f in enumerate(self.app_funcs):
             name = f"f{count+1}(x)"
+            old, new = function_name(f.get_name()), function_name(name)
+            if old and old != new: renames[old] = new
             f.set_name(name)
 
+        if renames:
+            for f in self.app_funcs:
+                f.set_text(rename_calls(f.get_text(), renames))
+
     def remove_from_app_funcs_list(self, app_func):
         self.app_funcs.remove(app_func)
+        if app_func in self.plot_model.entries:
+            self.plot_model.remove(app_func)
+            self.refresh_plot()
 
     def set_filename(self, new_filename):
         self.filename = new_filename
@@ -241,8 +643,15 @@ class MainWindow(QtWidgets.QWidget):
         filename += "  -  LDV-plt"
         self.setWindowTitle(filename)
 
+def report_startup():
+    # Used by benchmarks/startup.py
+    print("first frame", flush=True)
+    QtWidgets.QApplication.instance().quit()
+
 if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
     win = MainWindow()
+    if os.environ.get("LDV_PLT_STARTUP_BENCH"):
+        win.first_frame.connect(report_startup)
     win.show()
     sys.exit(app.exec_())
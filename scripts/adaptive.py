@@ -0,0 +1,85 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"Sample a function densely only where it bends"
+
+import numpy
+
+from composition import EMPTY_TABLE
+
+INITIAL_POINTS = 64
+MAX_DEPTH = 24
+
+class AdaptiveSampler:
+    def __init__(self, string, height_px=480, tolerance_px=0.5, table=EMPTY_TABLE):
+        self.string = string
+        self.table = table
+        self.height_px = max(height_px, 1)
+        self.tolerance_px = tolerance_px
+        self.evaluations = 0
+
+    def evaluate(self, xs):
+        self.evaluations += len(xs)
+        return self.table.evaluate(self.string, xs)
+
+    def tolerance(self, ys):
+        finite = ys[numpy.isfinite(ys)]
+        if not len(finite): return numpy.inf
+
+        y_range = finite.max() - finite.min() or 1.0
+        return self.tolerance_px * y_range / self.height_px
+
+    def sample(self, start, end, max_evals):
+        n_initial = max(min(INITIAL_POINTS, max_evals - 1), 1)
+        xs = numpy.linspace(start, end, n_initial + 1)
+        ys = self.evaluate(xs)
+        tolerance = self.tolerance(ys)
+
+        bad = numpy.arange(len(xs) - 1)
+        for _ in range(MAX_DEPTH):
+            bad = numpy.sort(bad[:max(max_evals - self.evaluations, 0)])
+            if not len(bad): break
+            xs, ys, bad = self.refine(xs, ys, bad, tolerance)
+
+        return xs, ys
+
+    def refine(self, xs, ys, bad, tolerance):
+        mid_xs = (xs[bad] + xs[bad + 1]) / 2
+        mid_ys = self.evaluate(mid_xs)
+        errors = self.errors(ys[bad], ys[bad + 1], mid_ys)
+
+        positions = bad + 1 + numpy.arange(len(bad))
+        xs = numpy.insert(xs, bad + 1, mid_xs)
+        ys = numpy.insert(ys, bad + 1, mid_ys)
+        return xs, ys, self.next_bad(positions, errors, tolerance)
+
+    def errors(self, left, right, mid):
+        # A nan on only some of the three points is a domain edge: refine it
+        with numpy.errstate(invalid="ignore"):
+            errors = numpy.abs(mid - (left + right) / 2)
+        nans = numpy.isnan(left) | numpy.isnan(right) | numpy.isnan(mid)
+        all_nans = numpy.isnan(left) & numpy.isnan(right) & numpy.isnan(mid)
+        errors[nans & ~all_nans] = numpy.inf
+        errors[all_nans] = 0
+        return errors
+
+    def next_bad(self, positions, errors, tolerance):
+        # Worst intervals first, so the budget is spent where it counts
+        order = numpy.argsort(-errors, kind="stable")
+        order = order[errors[order] > tolerance]
+        left = positions[order] - 1
+        return numpy.stack((left, left + 1), axis=1).ravel()
@@ -0,0 +1,159 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+
+"""Roots, extrema and integral of a curve, from its plotted samples.
+
+The samples are scanned with vectorized operations: sign changes of y
+bracket the roots, sign flips of the discrete derivative bracket the
+extrema, and the integral is Simpson's rule on uniform grids. Only the
+brackets are refined, all at once, by evaluating the function on one
+new point per bracket per step: the whole range is never sampled again.
+"""
+
+import csv
+import math
+
+import numpy
+
+ROOT_STEPS = 60
+EXTREMUM_STEPS = 40
+GOLDEN = (math.sqrt(5) - 1) / 2
+
+# Sign changes across poles, like the one of 1/x, are not roots
+ROOT_TOLERANCE = 1e-6
+
+class Analysis:
+    def __init__(self, roots, minima, maxima, integral, evaluations):
+        # roots are xs, minima and maxima (xs, ys) couples, integral a
+        # (value, error estimate) couple over the range of the samples
+        self.roots = roots
+        self.minima = minima
+        self.maxima = maxima
+        self.integral = integral
+        self.evaluations = evaluations
+
+    def points(self):
+        # (kind, xs, ys) arrays, to mark them on the plot
+        return [("root", self.roots, numpy.zeros_like(self.roots)),
+                ("minimum", *self.minima), ("maximum", *self.maxima)]
+
+    def rows(self):
+        # (kind, x, y, error) for every point found, then for the integral
+        return ([("root", x, 0.0, None) for x in self.roots.tolist()] +
+                [("minimum", x, y, None) for x, y in zip(*(a.tolist() for a in self.minima))] +
+                [("maximum", x, y, None) for x, y in zip(*(a.tolist() for a in self.maxima))] +
+                [("integral", None, *self.integral)])
+
+class CountingFunction:
+    def __init__(self, evaluate):
+        self.evaluate = evaluate
+        self.count = 0
+
+    def __call__(self, xs):
+        self.count += len(xs)
+        return numpy.asarray(self.evaluate(xs), dtype=float)
+
+def analyze(xs, ys, evaluate=None):
+    # evaluate(xs) -> ys refines the brackets; without it, the samples are used
+    xs, ys = numpy.asarray(xs, dtype=float), numpy.asarray(ys, dtype=float)
+    function = CountingFunction(evaluate) if evaluate else None
+    roots = find_roots(xs, ys, function)
+    minima = find_extrema(xs, ys, function, 1.0)
+    maxima = find_extrema(xs, ys, function, -1.0)
+    return Analysis(roots, minima, maxima, integrate(xs, ys),
+                    function.count if function else 0)
+
+def find_roots(xs, ys, function):
+    exact = xs[ys == 0]
+    i = numpy.flatnonzero(ys[:-1] * ys[1:] < 0)
+    if function is None or not len(i):
+        roots = xs[i] - ys[i] * (xs[i+1] - xs[i]) / (ys[i+1] - ys[i])
+    else:
+        roots = refine_roots(function, xs[i], xs[i+1], ys[i], ys[i+1])
+        scale = numpy.nanmax(numpy.abs(ys))
+        roots = roots[numpy.abs(function(roots)) <= ROOT_TOLERANCE * max(scale, 1.0)]
+    return numpy.sort(numpy.concatenate((exact, roots)))
+
+def refine_roots(function, a, b, fa, fb):
+    # Illinois false position on every bracket at once
+    for _ in range(ROOT_STEPS):
+        c = (a * fb - b * fa) / (fb - fa)
+        fc = function(c)
+        left = fc * fb < 0
+        a, fa, fb = (numpy.where(left, b, a), numpy.where(left, fb, fa * 0.5),
+                     numpy.where(left, fc, fb))
+        b, fb = c, fc
+        if numpy.all((fc == 0) | (numpy.abs(b - a) <= 1e-12 * numpy.abs(b) + 1e-300)): break
+    return b
+
+def find_extrema(xs, ys, function, sign):
+    # sign is 1 for the minima, -1 for the maxima
+    slopes = numpy.diff(sign * ys)
+    i = numpy.flatnonzero((slopes[:-1] < 0) & (slopes[1:] > 0)) + 1
+    if function is None or not len(i):
+        return xs[i], ys[i]
+
+    xs_min = golden_section(lambda x: sign * function(x), xs[i-1], xs[i+1])
+    found = function(xs_min)
+    better = sign * found <= sign * ys[i]
+    return numpy.where(better, xs_min, xs[i]), numpy.where(better, found, ys[i])
+
+def golden_section(function, a, b):
+    # Vectorized golden section search of a minimum in every [a, b]
+    c, d = b - GOLDEN * (b - a), a + GOLDEN * (b - a)
+    fc, fd = function(c), function(d)
+    for _ in range(EXTREMUM_STEPS):
+        left = fc < fd
+        a, b = numpy.where(left, a, c), numpy.where(left, d, b)
+        x = numpy.where(left, b - GOLDEN * (b - a), a + GOLDEN * (b - a))
+        fx = function(x)
+        c, fc, d, fd = (numpy.where(left, x, d), numpy.where(left, fx, fd),
+                        numpy.where(left, c, x), numpy.where(left, fc, fx))
+    return (a + b) / 2
+
+def integrate(xs, ys):
+    # (value, error estimate): Simpson against the trapezoids on uniform grids,
+    # else the trapezoids against the ones on every other sample
+    if len(xs) < 2: return 0.0, 0.0
+    value = trapezoid(xs, ys)
+    steps = numpy.diff(xs)
+    if len(xs) < 3 or not numpy.allclose(steps, steps[0], rtol=1e-6, atol=0):
+        coarse = numpy.unique(numpy.append(numpy.arange(0, len(xs), 2), len(xs) - 1))
+        return float(value), float(abs(value - trapezoid(xs[coarse], ys[coarse])))
+
+    fine = simpson(ys, steps[0])
+    return float(fine), float(abs(fine - value))
+
+def trapezoid(xs, ys):
+    return numpy.sum(numpy.diff(xs) * (ys[1:] + ys[:-1])) / 2
+
+def simpson(ys, step):
+    # An odd number of intervals ends with a trapezoid
+    n = len(ys) - 1 - (len(ys) - 1) % 2
+    value = step / 3 * (ys[0] + ys[n] + 4 * ys[1:n:2].sum() + 2 * ys[2:n-1:2].sum())
+    if n < len(ys) - 1: value += step / 2 * (ys[-2] + ys[-1])
+    return value
+
+def export_csv(filename, analyses):
+    # analyses is a list of (function name, Analysis) couples
+    with open(filename, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(("function", "kind", "x", "y", "error"))
+        for name, found in analyses:
+            for row in found.rows():
+                writer.writerow((name, *("" if value is None else value for value in row)))
@@ -0,0 +1,139 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"Render project files to images, or export their samples, without Qt"
+
+import os
+import sys
+import time
+import argparse
+from concurrent import futures
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from project import evaluate_project, dataset_path
+from binary_project import read_project_file
+from composition import FunctionTable
+from export import Exporter, format_throughput, FORMATS as EXPORT_FORMATS
+from datasets import load_dataset, InvalidDatasetError
+from sweep import add_family, parse_parameters
+from implicit import add_heatmap, is_2d
+
+FORMATS = ("png", "svg", "pdf")
+
+def create_figure():
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.set_xlabel("x")
+    ax.set_ylabel("y")
+    return figure, ax
+
+def output_name(filename, output_dir, fmt):
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(output_dir or os.path.dirname(filename), f"{name}.{fmt}")
+
+def render_file(filename, output_dir=None, fmt="png"):
+    started = time.perf_counter()
+    figure, ax = create_figure()
+    errors = []
+
+    project = read_project_file(filename)[0]
+    for name, xs, ys, error in evaluate_project(project):
+        if error: errors.append(f"{name}: {error}")
+        elif xs.ndim > 1: add_heatmap(ax, xs, ys, label=name)
+        elif ys.ndim > 1: add_family(ax, xs, ys, label=name)
+        else: ax.plot(xs, ys, label=name)
+    errors += plot_datasets(ax, filename, project.datasets)
+
+    output = output_name(filename, output_dir, fmt)
+    figure.savefig(output, format=fmt)
+    return output, time.perf_counter() - started, errors, ""
+
+def export_file(filename, output_dir=None, fmt="csv"):
+    # The samples of the curves and families: 2-D functions have no column
+    project = read_project_file(filename)[0]
+    try:
+        table = FunctionTable(project.funcs, parse_parameters(project.params))
+    except ValueError as error:
+        return None, 0.0, [str(error)], ""
+
+    functions = [(name, expression) for name, expression in project.funcs
+                 if expression and not is_2d(expression)]
+    exporter = Exporter(functions, table, project.x_settings)
+    output = output_name(filename, output_dir, fmt)
+    exporter.export(output, fmt)
+    errors = [f"{name}: {error}" for name, error in exporter.errors.items()]
+    return output, exporter.seconds, errors, f", {format_throughput(exporter.rows, exporter.seconds)}"
+
+def plot_datasets(ax, filename, datasets):
+    # Decimated to the width of the image, like in the GUI
+    width = int(ax.figure.get_figwidth() * ax.figure.dpi)
+    errors = []
+    for reference in datasets:
+        try:
+            dataset = load_dataset(dataset_path(filename, reference))
+        except InvalidDatasetError as error:
+            errors.append(str(error))
+        else:
+            ax.plot(*dataset.decimate(dataset.x_range, width), label=reference)
+    return errors
+
+def safe_render_file(filename, output_dir, fmt):
+    process = export_file if fmt in EXPORT_FORMATS else render_file
+    try:
+        return process(filename, output_dir, fmt)
+
+    # Any failure is reported for its file: the other files are still rendered
+    except Exception as error:
+        return None, 0.0, [f"{type(error).__name__}: {error}"], ""
+
+def render_files(filenames, output_dir, fmt, jobs):
+    with futures.ProcessPoolExecutor(jobs) as executor:
+        results = executor.map(safe_render_file, filenames,
+                               [output_dir] * len(filenames),
+                               [fmt] * len(filenames))
+        yield from zip(filenames, results)
+
+def report(filename, result):
+    output, seconds, errors, details = result
+    print(f"{filename} -> {output or 'failed'} ({seconds * 1000:.1f} ms{details})")
+    for error in errors:
+        print(f"    {error}", file=sys.stderr)
+    return output is not None and not errors
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Render LDV-plotter projects")
+    parser.add_argument("files", nargs="+", help="project files")
+    parser.add_argument("-o", "--output-dir", help="default: next to each file")
+    parser.add_argument("-f", "--format", choices=FORMATS + EXPORT_FORMATS, default="png",
+                        help="an image, or the sampled columns for csv, npy and ldvc")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+    results = render_files(args.files, args.output_dir, args.format, args.jobs)
+    ok = all([report(filename, result) for filename, result in results])
+
+    print(f"{len(args.files)} files in {time.perf_counter() - started:.2f} s")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"""Binary projects: the text project plus the last computed samples.
+
+Layout: MAGIC, the JSON header length as a little endian uint64, the
+JSON header, then the x and y arrays as raw little endian float64, each
+one starting at a multiple of ALIGNMENT, so they can be memory-mapped.
+"""
+
+import os
+import json
+import struct
+import tempfile
+
+import numpy
+
+from project import Project, InvalidProjectError, read_project, DEFAULT_Y_RANGE
+
+MAGIC = b"LDVPLTB\x01"
+BINARY_EXTENSION = ".ldvb"
+ALIGNMENT = 64
+DTYPE = numpy.dtype("<f8")
+
+def is_binary_project(filename):
+    with open(filename, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+def align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+class ArrayTable:
+    # Places the arrays in the file, storing a shared array only once
+    def __init__(self):
+        self.arrays = []
+        self.offsets = {}
+        self.size = 0
+
+    def add(self, array):
+        if id(array) not in self.offsets:
+            self.offsets[id(array)] = self.size
+            self.arrays.append(array)
+            self.size = align(self.size + numpy.size(array) * DTYPE.itemsize)
+        return {"offset": self.offsets[id(array)], "length": int(numpy.size(array)),
+                "shape": list(numpy.shape(array))}
+
+def make_header(project, curves, table):
+    # curves is a list of (func index, fingerprint, xs, ys) tuples
+    return {"version": 1, "funcs": project.funcs,
+            "x_settings": project.x_settings, "params": project.params,
+            "y_range": project.y_range, "datasets": project.datasets,
+            "curves": [{"func": index, "fingerprint": fingerprint,
+                        "x": table.add(xs), "y": table.add(ys)}
+                       for index, fingerprint, xs, ys in curves]}
+
+def write_arrays(file, arrays, data_start):
+    for array in arrays:
+        file.seek(data_start + align(file.tell() - data_start))
+        numpy.ascontiguousarray(array, dtype=DTYPE).tofile(file)
+
+def write_binary_project(filename, project, curves):
+    table = ArrayTable()
+    header = json.dumps(make_header(project, curves, table)).encode()
+    data_start = align(len(MAGIC) + 8 + len(header))
+
+    # Never truncate a file which may be memory-mapped: replace it
+    directory = os.path.dirname(os.path.abspath(filename))
+    with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as file:
+        file.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        file.write(b"\0" * (data_start - file.tell()))
+        write_arrays(file, table.arrays, data_start)
+    os.replace(file.name, filename)
+
+def read_header(filename):
+    with open(filename, "rb") as file:
+        file.read(len(MAGIC))
+        length, = struct.unpack("<Q", file.read(8))
+        header = json.loads(file.read(length))
+
+    return header, align(len(MAGIC) + 8 + length)
+
+def map_array(filename, data_start, place):
+    # Families of curves have 2-D y arrays
+    shape = tuple(place.get("shape", (place["length"],)))
+    if not place["length"]:
+        return numpy.empty(shape, dtype=DTYPE)
+    return numpy.memmap(filename, DTYPE, "r", data_start + place["offset"], shape)
+
+def to_fingerprint(value):
+    # JSON made the tuples lists: fingerprints are compared as tuples
+    if isinstance(value, list):
+        return tuple(to_fingerprint(item) for item in value)
+    return value
+
+def read_binary_project(filename):
+    try:
+        return map_binary_project(filename)
+
+    except (ValueError, KeyError, TypeError, struct.error):
+        raise InvalidProjectError(f"{filename} is not a valid binary project")
+
+def map_binary_project(filename):
+    header, data_start = read_header(filename)
+    project = Project([tuple(func) for func in header["funcs"]], header["x_settings"],
+                      [tuple(param) for param in header.get("params", [])],
+                      header.get("y_range", DEFAULT_Y_RANGE), header.get("datasets", []))
+    curves = [(curve["func"], to_fingerprint(curve["fingerprint"]),
+               map_array(filename, data_start, curve["x"]),
+               map_array(filename, data_start, curve["y"]))
+              for curve in header["curves"]]
+    return project, curves
+
+def read_project_file(filename):
+    # A (project, curves) couple, for text projects too
+    if is_binary_project(filename):
+        return read_binary_project(filename)
+    return read_project(filename), []
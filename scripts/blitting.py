@@ -0,0 +1,74 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+
+"""Blitted rendering: full draws only when the axes themselves change.
+
+The curves are animated artists: a full draw renders the axes, the grid
+and the labels, which are cached as the background, then the curves are
+drawn on top and cached as the underlay. New curve data is blitted on
+the background and the cursor overlays on the underlay, so neither
+re-rasterizes the axes, and moving the cursor re-rasterizes nothing
+but the overlays.
+"""
+
+class BlitManager:
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.figure = canvas.figure
+        self.background = None
+        self.underlay = None
+        self.overlays = []
+        canvas.mpl_connect("draw_event", self.on_draw)
+
+    def set_overlays(self, artists):
+        for artist in artists:
+            artist.set_animated(True)
+        self.overlays = list(artists)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_curves()
+
+    def get_curves(self):
+        artists = [artist for ax in self.figure.axes for artist in ax.get_children()
+                   if artist.get_animated() and artist not in self.overlays]
+        return sorted(artists, key=lambda artist: artist.get_zorder())
+
+    def draw_curves(self):
+        for artist in self.get_curves():
+            self.figure.draw_artist(artist)
+        self.underlay = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_overlays()
+
+    def draw_overlays(self):
+        for artist in self.overlays:
+            if artist.get_visible() and artist.axes in self.figure.axes:
+                self.figure.draw_artist(artist)
+
+    def update_curves(self):
+        # The curves changed, the axes did not
+        if self.background is None: return self.canvas.draw_idle()
+        self.canvas.restore_region(self.background)
+        self.draw_curves()
+        self.canvas.blit(self.figure.bbox)
+
+    def update_overlays(self):
+        if self.underlay is None: return
+        self.canvas.restore_region(self.underlay)
+        self.draw_overlays()
+        self.canvas.blit(self.figure.bbox)
@@ -0,0 +1,97 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"Parse, validate and compile expressions once"
+
+import ast
+import threading
+from collections import OrderedDict
+
+import math_funcs
+import optimizer
+
+SANDBOX_NAMES = frozenset(vars(math_funcs)) | {"x"}
+
+def normalize(string):
+    return " ".join(string.split())
+
+def validate(tree, names=SANDBOX_NAMES):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id not in names:
+            raise NameError(f"name '{node.id}' is not defined")
+
+class ExpressionCache:
+    # Shared by the GUI thread and the jobs: every access holds the lock
+    def __init__(self, max_size=256):
+        self.lock = threading.RLock()
+        self.max_size = max_size
+        self.codes = OrderedDict()
+        self.operations = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, string, names=frozenset()):
+        # names are allowed besides the sandbox ones
+        key = (normalize(string), names)
+        with self.lock:
+            if key in self.codes:
+                self.hits += 1
+                self.codes.move_to_end(key)
+                return self.codes[key]
+
+            self.misses += 1
+            return self.add(key)
+
+    def add(self, key):
+        string, names = key
+        tree = ast.parse(string, mode="eval")
+        validate(tree, SANDBOX_NAMES | names)
+        before = optimizer.count_operations(tree)
+        tree = optimizer.optimize(tree, names)
+        code = compile(tree, "<expression>", "eval")
+
+        self.codes[key] = code
+        self.operations[key] = (before, optimizer.count_operations(tree))
+        if len(self.codes) > self.max_size:
+            self.operations.pop(self.codes.popitem(last=False)[0])
+        return code
+
+    def get_operations(self, string, names=frozenset()):
+        # The (before, after) optimization operation counts of string
+        with self.lock:
+            self.get(string, names)
+            return self.operations[(normalize(string), names)]
+
+    def clear(self):
+        with self.lock:
+            self.codes.clear()
+            self.operations.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.codes), "max_size": self.max_size,
+                    "hits": self.hits, "misses": self.misses}
+
+EXPRESSION_CACHE = ExpressionCache()
+
+def compile_expr(string, names=frozenset()):
+    return EXPRESSION_CACHE.get(string, names)
+
+def count_operations(string, names=frozenset()):
+    return EXPRESSION_CACHE.get_operations(string, names)
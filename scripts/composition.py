@@ -0,0 +1,198 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"""Functions calling other functions, like f3 = f1(x) * f2(x).
+
+The calls make a dependency graph, which must be acyclic. Evaluating
+on a grid, every function is evaluated once and its y array is reused
+by every f(x) call on the same grid; only calls with another argument,
+like f1(x/2), really evaluate the called function. Functions using a
+sweep parameter, or calling a function which does, are families, and
+so are the functions plotted with their derivatives.
+"""
+
+import ast
+import re
+
+import numpy
+
+import sweep
+import derivatives
+import func_generator
+from compiler import SANDBOX_NAMES, normalize
+
+ROW_NAME = re.compile(r"^\s*([A-Za-z_]\w*)\s*\(\s*x\s*\)\s*$")
+
+class CyclicDependencyError(ValueError): pass
+
+def function_name(row_name):
+    # "f1(x)" -> "f1"; None for names which can't be called
+    match = ROW_NAME.match(row_name)
+    if match and match.group(1) not in SANDBOX_NAMES:
+        return match.group(1)
+
+def called_names(string):
+    # The names string calls, or uses; broken expressions call nothing
+    try:
+        tree = ast.parse(string.strip(), mode="eval")
+    except SyntaxError:
+        return set()
+    return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+
+def rename_calls(string, renames):
+    # string with the names in renames replaced, leaving the rest of the
+    # text as it was typed; broken expressions are left as they are
+    prefix, stripped = string[:len(string) - len(string.lstrip())], string.lstrip()
+    try:
+        tree = ast.parse(stripped, mode="eval")
+    except SyntaxError:
+        return string
+
+    # ast offsets count UTF-8 bytes
+    text = stripped.encode()
+    starts = [0]
+    for line in text.splitlines(keepends=True):
+        starts.append(starts[-1] + len(line))
+    nodes = [node for node in ast.walk(tree)
+             if isinstance(node, ast.Name) and node.id in renames]
+    for node in sorted(nodes, key=lambda node: (node.lineno, node.col_offset), reverse=True):
+        start = starts[node.lineno - 1] + node.col_offset
+        text = text[:start] + renames[node.id].encode() + text[start + len(node.id.encode()):]
+    return prefix + text.decode()
+
+class RowFunction:
+    def __init__(self, table, name, xs, memo, columns):
+        self.table = table
+        self.string = table.funcs[name]
+        self.xs = xs
+        self.memo = memo
+        self.columns = columns
+
+    def __call__(self, arg):
+        if arg is self.xs:
+            return self.table.evaluate_on(self.string, self.xs, self.memo, self.columns)
+        return self.table.evaluate_on(self.string, numpy.asarray(arg, dtype=float),
+                                      {}, self.columns)
+
+class FunctionTable:
+    def __init__(self, rows=(), parameters=()):
+        # rows are (row name, expression) couples, parameters sweep.Parameter;
+        # calling a row plotted with its derivatives calls the function only
+        self.funcs = {}
+        for row_name, string in rows:
+            name = function_name(row_name)
+            if name and string: self.funcs[name] = derivatives.split(string)[1]
+
+        self.params = {parameter.name: parameter for parameter in parameters}
+        for name in set(self.funcs) & set(self.params):
+            raise ValueError(f"{name} is both a function and a parameter")
+
+        self.names = frozenset(self.funcs) | frozenset(self.params)
+        self.deps = {}
+        self.check_cycles()
+
+    def dependencies(self, string):
+        # Broken expressions call nothing: evaluating them reports the error
+        key = normalize(string)
+        if key not in self.deps:
+            self.deps[key] = sorted(self.find_names(key))
+        return self.deps[key]
+
+    def find_names(self, string):
+        try:
+            tree = ast.parse(string, mode="eval")
+        except SyntaxError:
+            return set()
+        return {node.id for node in ast.walk(tree)
+                if isinstance(node, ast.Name) and node.id in self.names}
+
+    def parameters(self, string):
+        # The parameters used by string and by the functions it calls
+        found = set()
+        for name in self.dependencies(string):
+            if name in self.params: found.add(name)
+            else: found.update(self.parameters(self.funcs[name]))
+        return sorted(found)
+
+    def is_family(self, string):
+        return bool(self.parameters(string)) or derivatives.split(string)[0] > 0
+
+    def shape(self, string, n_points):
+        counts = [self.params[name].count for name in self.parameters(string)]
+        counts.append(derivatives.split(string)[0] + 1)
+        rows = int(numpy.prod(counts))
+        return (rows, n_points) if self.is_family(string) else (n_points,)
+
+    def check_cycles(self):
+        state = {}
+        for name in self.funcs:
+            self.visit(name, state, [])
+
+    def visit(self, name, state, path):
+        if state.get(name) == "done": return
+        if state.get(name) == "visiting":
+            cycle = path[path.index(name):] + [name]
+            raise CyclicDependencyError("circular definition: " + " -> ".join(cycle))
+
+        state[name] = "visiting"
+        for dependency in self.dependencies(self.funcs[name]):
+            if dependency in self.funcs: self.visit(dependency, state, path + [name])
+        state[name] = "done"
+
+    def signature(self, string):
+        # Changes whenever string, a function it calls or a range changes
+        parts = [f"{name}={self.params[name].format_range()}" if name in self.params
+                 else f"{name}={self.signature(self.funcs[name])}"
+                 for name in self.dependencies(string)]
+        return string if not parts else f"{string} where {'; '.join(parts)}"
+
+    def evaluate(self, string, xs, memo=None):
+        # memo maps the expressions already evaluated on xs to their ys
+        memo = {} if memo is None else memo
+        order, expression = derivatives.split(string)
+        if order: return self.evaluate_derivatives(expression, xs, order)
+
+        names = self.parameters(string)
+        if not names: return self.evaluate_on(string, xs, memo, {})
+
+        columns = sweep.make_columns([self.params[name] for name in names])
+        return self.evaluate_family(string, xs, memo.setdefault(tuple(names), {}), columns)
+
+    def evaluate_derivatives(self, string, xs, order):
+        # One pass on jets: the derivatives come with the values
+        names = self.parameters(string)
+        columns = sweep.make_columns([self.params[name] for name in names]) if names else {}
+        return derivatives.evaluate(self, string, xs, order, columns)
+
+    def evaluate_family(self, string, xs, memo, columns):
+        # One broadcasted pass, else row by row, with scalar parameters
+        grid = numpy.broadcast_to(xs, (sweep.n_rows(columns), len(xs)))
+        try:
+            return self.evaluate_on(string, grid, memo, columns)
+        except func_generator.VEC_FALLBACK_ERRORS:
+            return numpy.array([self.evaluate_on(string, xs, {}, row)
+                                for row in sweep.iter_rows(columns)])
+
+    def evaluate_on(self, string, xs, memo, columns):
+        if string not in memo:
+            names = {name: columns[name] if name in self.params else
+                     RowFunction(self, name, xs, memo, columns)
+                     for name in self.dependencies(string)}
+            memo[string] = func_generator.evaluate(string, xs, names)
+        return memo[string]
+
+EMPTY_TABLE = FunctionTable()
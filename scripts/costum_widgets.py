@@ -16,9 +16,18 @@
 # Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
 
 from PySide2 import QtWidgets, QtCore, QtGui
+import functools
 import sys
 import os
 
+import derivatives
+
+@functools.lru_cache(maxsize=None)
+def read_stylesheet(name):
+    installationfolder = os.path.dirname(os.path.dirname(__file__))
+    with open(f"{installationfolder}/stylesheets/{name}", "r") as file:
+        return file.read()
+
 class MainMenu(QtWidgets.QMenuBar):
     def __init__(self, main_window):
         QtWidgets.QMenuBar.__init__(self, main_window)
@@ -33,21 +42,62 @@ class MainMenu(QtWidgets.QMenuBar):
         self.open_action = QtWidgets.QAction("Open")
         self.save_action = QtWidgets.QAction("Save")
         self.save_as_action = QtWidgets.QAction("Save as")
+        self.import_action = QtWidgets.QAction("Import dataset")
+        self.export_action = QtWidgets.QAction("Export samples")
         self.quit_action = QtWidgets.QAction("Quit")
+        self.create_tools_actions()
+
+    def create_tools_actions(self):
+        self.timings_action = QtWidgets.QAction("Show timings")
+        self.timings_action.setCheckable(True)
+        self.crosshair_action = QtWidgets.QAction("Show crosshair")
+        self.crosshair_action.setCheckable(True)
+        self.crosshair_action.setChecked(True)
+        self.export_trace_action = QtWidgets.QAction("Export trace")
+        self.profile_action = QtWidgets.QAction("Profile next plot")
+        self.analyze_action = QtWidgets.QAction("Analyze curves")
+        self.cache_stats_action = QtWidgets.QAction("Cache statistics")
+        self.clear_cache_action = QtWidgets.QAction("Clear cache")
 
     def connect_actions(self):
         self.new_action.triggered.connect(lambda: self.main_window.new_file())
         self.open_action.triggered.connect(self.main_window.open_file)
         self.save_action.triggered.connect(self.main_window.save_file)
         self.save_as_action.triggered.connect(self.main_window.save_file_as)
+        self.import_action.triggered.connect(lambda: self.main_window.import_dataset())
+        self.export_action.triggered.connect(lambda: self.main_window.export_samples())
         self.quit_action.triggered.connect(lambda: sys.exit(0))
+        self.connect_tools_actions()
+
+    def connect_tools_actions(self):
+        self.timings_action.toggled.connect(lambda shown: self.main_window.show_timings(shown))
+        self.crosshair_action.toggled.connect(lambda shown: self.main_window.show_crosshair(shown))
+        self.export_trace_action.triggered.connect(lambda: self.main_window.export_trace())
+        self.profile_action.triggered.connect(lambda: self.main_window.profile_next_plot())
+        self.analyze_action.triggered.connect(lambda: self.main_window.analyze())
+        self.cache_stats_action.triggered.connect(lambda: self.main_window.show_cache_stats())
+        self.clear_cache_action.triggered.connect(lambda: self.main_window.clear_cache())
 
     def add_actions(self):
         self.addAction(self.new_action)
         self.addAction(self.open_action)
         self.addAction(self.save_action)
         self.addAction(self.save_as_action)
+        self.addAction(self.import_action)
+        self.addAction(self.export_action)
         self.addAction(self.quit_action)
+        self.add_tools_menu()
+
+    def add_tools_menu(self):
+        self.tools_menu = self.addMenu("Tools")
+        self.tools_menu.addAction(self.timings_action)
+        self.tools_menu.addAction(self.crosshair_action)
+        self.tools_menu.addAction(self.export_trace_action)
+        self.tools_menu.addAction(self.profile_action)
+        self.tools_menu.addAction(self.analyze_action)
+        self.tools_menu.addSeparator()
+        self.tools_menu.addAction(self.cache_stats_action)
+        self.tools_menu.addAction(self.clear_cache_action)
 
 class VerticalCostumLayout(QtWidgets.QVBoxLayout):
     def __init__(self, parent):
@@ -104,23 +154,34 @@ class AppFunc(QtWidgets.QHBoxLayout):
     def add_widgets(self):
         self.addWidget(self.entry_doc)
         self.addWidget(self.entry)
+        self.addWidget(self.order)
         self.addWidget(self.close_button)
 
     def set_focus_policy(self):
         self.entry.setFocusPolicy(QtCore.Qt.StrongFocus)
+        self.entry.textEdited.connect(lambda text: self.master.schedule_preview())
+        self.order.valueChanged.connect(lambda order: self.master.schedule_preview())
 
     def create_widgets(self):
         self.entry = QtWidgets.QLineEdit()
         self.entry_doc = QtWidgets.QLabel(f"{self.name} = ")
+        self.create_order()
         self.create_close_button()
 
+    def create_order(self):
+        # The derivatives plotted with the function, up to this order
+        self.order = QtWidgets.QSpinBox()
+        self.order.setRange(0, derivatives.MAX_ORDER)
+        self.order.setPrefix("d/dx ^ ")
+        self.order.setSpecialValueText("no d/dx")
+        self.order.setToolTip("Plot the derivatives of the function up to this order")
+
     def create_close_button(self):
         self.close_button = QtWidgets.QPushButton("X")
-        self.close_button.clicked.connect(self.delete)
+        self.close_button.clicked.connect(lambda: self.master.delete_func(self))
 
 
-        installationfolder = os.path.dirname(os.path.dirname(__file__))
-        css = open(f"{installationfolder}/stylesheets/close_button_stylesheet.css","r").read()
+        css = read_stylesheet("close_button_stylesheet.css")
         self.close_button.setStyleSheet(css)
 
     def delete(self):
@@ -131,6 +192,7 @@ class AppFunc(QtWidgets.QHBoxLayout):
     def delete_widgets(self):
         self.entry.deleteLater()
         self.entry_doc.deleteLater()
+        self.order.deleteLater()
         self.close_button.deleteLater()
 
     def focus(self):
@@ -148,3 +210,82 @@ class AppFunc(QtWidgets.QHBoxLayout):
 
     def get_text(self):
         return self.entry.text()
+
+    def set_definition(self, definition):
+        order, text = derivatives.split(definition)
+        self.set_text(text)
+        self.order.setValue(order)
+
+    def get_definition(self):
+        # What is plotted and saved: the text, with the derivatives order
+        return derivatives.join(self.get_text(), self.order.value())
+
+class AppParam(QtWidgets.QHBoxLayout):
+    # A sweep parameter: its name and its start:end:count range
+    def __init__(self, name, master):
+        QtWidgets.QHBoxLayout.__init__(self)
+        self.master = master
+        self.create_widgets(name)
+        self.add_widgets()
+        self.connect_widgets()
+
+    def create_widgets(self, name):
+        self.name_entry = QtWidgets.QLineEdit(name)
+        self.name_entry.setMaximumWidth(60)
+        self.entry = QtWidgets.QLineEdit()
+        self.entry.setPlaceholderText("start:end:count")
+        self.close_button = QtWidgets.QPushButton("X")
+        self.close_button.setStyleSheet(read_stylesheet("close_button_stylesheet.css"))
+
+    def add_widgets(self):
+        self.addWidget(self.name_entry)
+        self.addWidget(QtWidgets.QLabel("="))
+        self.addWidget(self.entry)
+        self.addWidget(self.close_button)
+
+    def connect_widgets(self):
+        self.close_button.clicked.connect(self.delete)
+        for entry in (self.name_entry, self.entry):
+            entry.textEdited.connect(lambda text: self.master.schedule_preview())
+
+    def delete(self):
+        self.master.remove_from_app_params_list(self)
+        for i in reversed(range(self.count())):
+            self.itemAt(i).widget().deleteLater()
+
+    def focus(self):
+        self.entry.setFocus()
+
+    def set_text(self, text):
+        self.entry.setText(text)
+
+    def get_name(self):
+        return self.name_entry.text()
+
+    def get_text(self):
+        return self.entry.text()
+
+class AppDataset(QtWidgets.QHBoxLayout):
+    # An imported dataset, plotted over the functions
+    def __init__(self, filename, master):
+        QtWidgets.QHBoxLayout.__init__(self)
+        self.filename = filename
+        self.master = master
+        self.label = QtWidgets.QLabel(f"data = {self.get_name()}")
+        self.label.setToolTip(filename)
+        self.close_button = QtWidgets.QPushButton("X")
+        self.close_button.setStyleSheet(read_stylesheet("close_button_stylesheet.css"))
+        self.close_button.clicked.connect(self.delete)
+        self.addWidget(self.label, 1)
+        self.addWidget(self.close_button)
+
+    def delete(self):
+        self.master.remove_from_app_datasets_list(self)
+        self.label.deleteLater()
+        self.close_button.deleteLater()
+
+    def get_filename(self):
+        return self.filename
+
+    def get_name(self):
+        return os.path.basename(self.filename)
@@ -0,0 +1,87 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+
+"""A crosshair following the cursor, with the y of every curve at its x.
+
+The lines are blitted; the readout is a Qt label, since rasterizing
+text with Agg would cost more than the rest of the frame.
+"""
+
+class Crosshair:
+    def __init__(self, main_layout):
+        self.main_layout = main_layout
+        self.ax = None
+        self.curves = []
+        self.enabled = True
+        self.connected = False
+
+    def watch(self, ax):
+        from matplotlib.lines import Line2D
+
+        self.ax = ax
+        self.v_line = Line2D([0, 0], [0, 1], transform=ax.get_xaxis_transform())
+        self.h_line = Line2D([0, 1], [0, 0], transform=ax.get_yaxis_transform())
+        for artist in (self.v_line, self.h_line):
+            artist.set(color="gray", linewidth=0.8, zorder=10)
+            ax.add_artist(artist)
+        self.set_visible(False)
+        self.main_layout.get_blitter().set_overlays([self.v_line, self.h_line])
+        self.connect(ax.figure.canvas)
+
+    def connect(self, canvas):
+        if self.connected: return
+        self.connected = True
+        canvas.mpl_connect("motion_notify_event", self.on_move)
+        canvas.mpl_connect("axes_leave_event", lambda event: self.hide())
+
+    def set_curves(self, curves):
+        # curves is a list of (name, curve) couples
+        self.curves = curves
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if not enabled: self.hide()
+
+    def set_visible(self, visible):
+        for artist in (self.v_line, self.h_line):
+            artist.set_visible(visible)
+
+    def hide(self):
+        if self.ax is None or not self.v_line.get_visible(): return
+        self.set_visible(False)
+        self.main_layout.set_readout("")
+        self.main_layout.get_blitter().update_overlays()
+
+    def on_move(self, event):
+        if not self.enabled or self.ax is None or event.inaxes is not self.ax:
+            return self.hide()
+
+        x, y = event.xdata, event.ydata
+        self.v_line.set_xdata([x, x])
+        self.h_line.set_ydata([y, y])
+        self.main_layout.set_readout(self.readout(x, y))
+        self.set_visible(True)
+        self.main_layout.get_blitter().update_overlays()
+
+    def readout(self, x, y):
+        values = [f"x = {x:.6g}", f"y = {y:.6g}"]
+        for name, curve in self.curves:
+            value = curve.value_at(x, y)
+            if value is not None:
+                values.append(f"{name} = {value:.6g}")
+        return "    ".join(values)
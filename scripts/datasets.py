@@ -0,0 +1,142 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+
+"""Measured (x, y) samples, memory-mapped or parsed chunk by chunk.
+
+Binary datasets are never read into memory: .npy files and raw
+little endian float pairs (.f64, .f32) are memory-mapped, and only
+the chunks being decimated are paged in. Text files are comma or
+whitespace separated columns, parsed CHUNK_ROWS lines at a time.
+A single column is plotted against the row index.
+"""
+
+import os
+import itertools
+
+import numpy
+
+from decimation import M4Reducer
+
+CHUNK_ROWS = 1 << 16
+RAW_DTYPES = {".f64": "<f8", ".bin": "<f8", ".f32": "<f4"}
+
+class InvalidDatasetError(Exception):
+    pass
+
+class Dataset:
+    def __init__(self, filename, columns):
+        # columns is a (rows, 1 or more) array, a memmap for binary files
+        self.filename = filename
+        self.columns = columns
+        self.is_sorted = True
+        self.x_range = (0.0, 0.0)
+        self.scan()
+
+    def __len__(self):
+        return len(self.columns)
+
+    def get_x(self, first, stop):
+        if self.columns.shape[1] < 2:
+            return numpy.arange(first, stop, dtype=numpy.float64)
+        return numpy.asarray(self.columns[first:stop, 0], dtype=numpy.float64)
+
+    def get_y(self, first, stop):
+        return numpy.asarray(self.columns[first:stop, -1], dtype=numpy.float64)
+
+    def chunks(self, first=0, stop=None):
+        stop = len(self) if stop is None else stop
+        for index in range(first, stop, CHUNK_ROWS):
+            end = min(index + CHUNK_ROWS, stop)
+            xs, ys = self.get_x(index, end), self.get_y(index, end)
+            finite = numpy.isfinite(xs)
+            yield xs[finite], ys[finite]
+
+    def scan(self):
+        # One pass for the x range and for telling sorted data apart
+        low, high, last = numpy.inf, -numpy.inf, -numpy.inf
+        for xs, _ in self.chunks():
+            if not len(xs): continue
+            self.is_sorted &= bool(xs[0] >= last and numpy.all(xs[1:] >= xs[:-1]))
+            low, high, last = min(low, xs.min()), max(high, xs.max()), xs[-1]
+
+        if low <= high: self.x_range = (float(low), float(high))
+
+    def window(self, lims):
+        # The rows which may be in [lims[0], lims[1]]
+        if self.columns.shape[1] < 2:
+            first, stop = numpy.clip((numpy.ceil(lims[0]), numpy.floor(lims[1]) + 1),
+                                     0, len(self))
+            return int(first), int(stop)
+        if not self.is_sorted:
+            return 0, len(self)
+        xs = self.columns[:, 0]
+        return (int(numpy.searchsorted(xs, lims[0], "left")),
+                int(numpy.searchsorted(xs, lims[1], "right")))
+
+    def decimate(self, lims, width):
+        # Same M4 decimation as the function curves, on the rows in lims
+        reducer = M4Reducer(*lims, width)
+        for xs, ys in self.chunks(*self.window(lims)):
+            inside = (xs >= lims[0]) & (xs <= lims[1])
+            reducer.add(xs[inside], ys[inside])
+        return reducer.get_points()
+
+def as_columns(array):
+    if array.ndim == 1: return array.reshape(-1, 1)
+    if array.ndim == 2 and array.shape[1]: return array
+    raise InvalidDatasetError(f"expected 1 or 2 columns, got the shape {array.shape}")
+
+def map_npy(filename):
+    return as_columns(numpy.load(filename, mmap_mode="r", allow_pickle=False))
+
+def map_raw(filename):
+    dtype = numpy.dtype(RAW_DTYPES[os.path.splitext(filename)[1].lower()])
+    if os.path.getsize(filename) % (2 * dtype.itemsize):
+        raise InvalidDatasetError("raw datasets are made of (x, y) couples")
+    if not os.path.getsize(filename): return numpy.empty((0, 2))
+    return numpy.memmap(filename, dtype, "r").reshape(-1, 2)
+
+def parse_lines(lines, delimiter):
+    return numpy.loadtxt(lines, delimiter=delimiter, ndmin=2, dtype=numpy.float64)
+
+def parse_text(filename):
+    with open(filename) as file:
+        first = file.readline()
+        delimiter = "," if "," in first else None
+        try:
+            chunks = [parse_lines([first], delimiter)]
+        except ValueError:
+            chunks = []  # A header line
+
+        while lines := list(itertools.islice(file, CHUNK_ROWS)):
+            chunks.append(parse_lines(lines, delimiter))
+
+    return as_columns(numpy.concatenate(chunks) if chunks else numpy.empty((0, 1)))
+
+def read_columns(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".npy": return map_npy(filename)
+    if extension in RAW_DTYPES: return map_raw(filename)
+    return parse_text(filename)
+
+def load_dataset(filename):
+    try:
+        return Dataset(filename, read_columns(filename))
+
+    except (OSError, ValueError) as error:
+        raise InvalidDatasetError(f"{filename}: {error}")
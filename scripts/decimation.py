@@ -0,0 +1,126 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"""Per pixel column first/min/max/last (M4) decimation of sorted samples.
+
+A line through the four extreme points of every pixel column rasterizes
+like the line through all the samples, so only 4 points per column are
+kept, whatever the number of samples.
+"""
+
+import numpy
+
+from grid import x_chunks
+from composition import EMPTY_TABLE
+
+# Curves with fewer points per pixel column are plotted as they are
+DECIMATION_MIN_POINTS_PER_PIXEL = 4
+
+def is_worth(n_points, width):
+    return n_points + 1 > DECIMATION_MIN_POINTS_PER_PIXEL * max(width, 1)
+
+def segments(columns):
+    starts = numpy.flatnonzero(numpy.diff(columns)) + 1
+    starts = numpy.concatenate(([0], starts))
+    stops = numpy.append(starts[1:], len(columns))
+    return starts, stops
+
+def arg_extreme(ys, starts, stops):
+    # Index of the smallest non nan y of every segment (or of the first y)
+    segment_ids = numpy.repeat(numpy.arange(len(starts)), stops - starts)
+    keys = numpy.where(numpy.isnan(ys), numpy.inf, ys)
+    return numpy.lexsort((keys, segment_ids))[starts]
+
+class M4Reducer:
+    def __init__(self, start, end, width):
+        self.start = start
+        self.end = end
+        self.width = max(int(width), 1)
+        self.first_x = numpy.full(self.width, numpy.inf)
+        self.first_y = numpy.full(self.width, numpy.nan)
+        self.last_x = numpy.full(self.width, -numpy.inf)
+        self.last_y = numpy.full(self.width, numpy.nan)
+        self.min_x, self.min_y = self.first_x.copy(), numpy.full(self.width, numpy.inf)
+        self.max_x, self.max_y = self.first_x.copy(), numpy.full(self.width, -numpy.inf)
+
+    def columns(self, xs):
+        scale = self.width / ((self.end - self.start) or 1.0)
+        columns = ((xs - self.start) * scale).astype(numpy.int64)
+        return numpy.clip(columns, 0, self.width - 1)
+
+    def add(self, xs, ys):
+        if not len(xs): return
+        columns = self.columns(xs)
+        starts, stops = segments(columns)
+        cols = columns[starts]
+
+        self.set_first(cols, xs[starts], ys[starts])
+        self.set_last(cols, xs[stops - 1], ys[stops - 1])
+        i_min = arg_extreme(ys, starts, stops)
+        i_max = arg_extreme(-ys, starts, stops)
+        self.set_min(cols, xs[i_min], ys[i_min])
+        self.set_max(cols, xs[i_max], ys[i_max])
+
+    def set_first(self, cols, xs, ys):
+        new = xs < self.first_x[cols]
+        self.first_x[cols[new]], self.first_y[cols[new]] = xs[new], ys[new]
+
+    def set_last(self, cols, xs, ys):
+        new = xs > self.last_x[cols]
+        self.last_x[cols[new]], self.last_y[cols[new]] = xs[new], ys[new]
+
+    def set_min(self, cols, xs, ys):
+        new = ys < self.min_y[cols]
+        self.min_x[cols[new]], self.min_y[cols[new]] = xs[new], ys[new]
+
+    def set_max(self, cols, xs, ys):
+        new = ys > self.max_y[cols]
+        self.max_x[cols[new]], self.max_y[cols[new]] = xs[new], ys[new]
+
+    def merge(self, other):
+        cols = numpy.arange(self.width)
+        self.set_first(cols, other.first_x, other.first_y)
+        self.set_last(cols, other.last_x, other.last_y)
+        self.set_min(cols, other.min_x, other.min_y)
+        self.set_max(cols, other.max_x, other.max_y)
+
+    def get_points(self):
+        filled = numpy.isfinite(self.first_x)
+        xs = numpy.stack((self.first_x, self.min_x, self.max_x, self.last_x), 1)
+        ys = numpy.stack((self.first_y, self.min_y, self.max_y, self.last_y), 1)
+        xs, ys = xs[filled], ys[filled]
+
+        # Columns are numbered from start: from the right on descending ranges
+        if self.start > self.end: xs, ys = xs[::-1], ys[::-1]
+
+        # Columns made only of nans have no min and max
+        missing = numpy.isinf(ys[:, 1:3])
+        xs[:, 1:3][missing] = xs[:, :1].repeat(2, 1)[missing]
+        ys[:, 1:3][missing] = numpy.nan
+
+        order = numpy.argsort(xs, axis=1, kind="stable")
+        return (numpy.take_along_axis(xs, order, 1).ravel(),
+                numpy.take_along_axis(ys, order, 1).ravel())
+
+def decimate_range(string, x_settings, width, first=0, stop=None, table=EMPTY_TABLE):
+    # Evaluates the points [first, stop) of the grid, chunk by chunk
+    start, end, n_points = x_settings
+    reducer = M4Reducer(start, end, width)
+    for _, xs in x_chunks(*x_settings, first=first, stop=stop):
+        reducer.add(xs, table.evaluate(string, xs))
+
+    return reducer
@@ -0,0 +1,231 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+
+"""Exact derivatives of any order, by forward mode differentiation.
+
+x is replaced by a Jet: the truncated Taylor series of the identity at
+every point, a generalization of the dual numbers to higher orders.
+Every operation, and every ufunc of np_math_funcs, maps jets to jets,
+so one vectorized pass of the expression gives f, f', ..., f^(order).
+A row plotted with its derivatives has the plotted string
+"derivatives(<expression>, <order>)".
+"""
+
+import re
+import math
+
+import numpy
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+import sweep
+import compiler
+import np_math_funcs
+import func_generator
+
+DERIVATIVES = re.compile(r"^derivatives\((.*), (\d+)\)$", re.S)
+MAX_ORDER = 8
+
+def split(string):
+    # "derivatives(sin(x), 2)" -> (2, "sin(x)"); (0, string) for the others
+    match = DERIVATIVES.match(string)
+    return (int(match.group(2)), match.group(1)) if match else (0, string)
+
+def join(string, order):
+    return f"derivatives({string}, {order})" if order else string
+
+def mul(a, b):
+    # The Cauchy product of two truncated series
+    return [sum(a[j] * b[k-j] for j in range(k + 1)) for k in range(len(a))]
+
+def div(a, b):
+    h = []
+    for k in range(len(a)):
+        h.append((a[k] - sum(b[j] * h[k-j] for j in range(1, k + 1))) / b[0])
+    return h
+
+def sqrt(a):
+    h = [numpy.sqrt(a[0])]
+    for k in range(1, len(a)):
+        h.append((a[k] - sum(h[j] * h[k-j] for j in range(1, k))) / (2 * h[0]))
+    return h
+
+def exp(a):
+    h = [numpy.exp(a[0])]
+    for k in range(1, len(a)):
+        h.append(sum(j * a[j] * h[k-j] for j in range(1, k + 1)) / k)
+    return h
+
+def log(a):
+    h = [numpy.log(a[0])]
+    for k in range(1, len(a)):
+        h.append((a[k] - sum(j * h[j] * a[k-j] for j in range(1, k)) / k) / a[0])
+    return h
+
+def sin_cos(a):
+    s, c = [numpy.sin(a[0])], [numpy.cos(a[0])]
+    for k in range(1, len(a)):
+        s.append(sum(j * a[j] * c[k-j] for j in range(1, k + 1)) / k)
+        c.append(-sum(j * a[j] * s[k-j] for j in range(1, k + 1)) / k)
+    return s, c
+
+def int_power(a, n):
+    # Exact where a is 0 too, unlike the real power
+    h = [1.0] + [0.0] * (len(a) - 1)
+    for _ in range(abs(n)):
+        h = mul(h, a)
+    return h if n >= 0 else div([1.0] + [0.0] * (len(a) - 1), h)
+
+def real_power(a, r):
+    h = [numpy.power(a[0], r)]
+    for k in range(1, len(a)):
+        terms = sum(((r + 1) * j - k) * a[j] * h[k-j] for j in range(1, k + 1))
+        h.append(terms / (k * a[0]))
+    return h
+
+def power(a, b):
+    if not is_constant(b): return exp(mul(b, log(a)))
+    if numpy.ndim(b[0]) == 0 and float(b[0]).is_integer() and abs(b[0]) <= 64:
+        return int_power(a, int(b[0]))
+    return real_power(a, b[0])
+
+def select(keep, a, b):
+    return [numpy.where(keep, x, y) for x, y in zip(a, b)]
+
+def maximum(a, b):
+    return [numpy.maximum(a[0], b[0])] + select(a[0] >= b[0], a, b)[1:]
+
+def minimum(a, b):
+    return [numpy.minimum(a[0], b[0])] + select(a[0] <= b[0], a, b)[1:]
+
+def is_constant(a):
+    return all(numpy.ndim(c) == 0 and c == 0 for c in a[1:])
+
+def constant(a):
+    # Piecewise constant functions, like floor: their derivatives are 0
+    return [a[0]] + [0.0] * (len(a) - 1)
+
+RULES = {
+    numpy.add: lambda a, b: [x + y for x, y in zip(a, b)],
+    numpy.subtract: lambda a, b: [x - y for x, y in zip(a, b)],
+    numpy.negative: lambda a: [-x for x in a],
+    numpy.positive: lambda a: a,
+    numpy.multiply: mul,
+    numpy.true_divide: div,
+    numpy.power: power,
+    numpy.sqrt: sqrt,
+    numpy.exp: exp,
+    numpy.log: log,
+    numpy.sin: lambda a: sin_cos(a)[0],
+    numpy.cos: lambda a: sin_cos(a)[1],
+    numpy.absolute: lambda a: [numpy.sign(a[0]) * x for x in a],
+    numpy.floor: lambda a: constant([numpy.floor(a[0])] + a[1:]),
+    numpy.ceil: lambda a: constant([numpy.ceil(a[0])] + a[1:]),
+    numpy.floor_divide: lambda a, b: constant([numpy.floor_divide(a[0], b[0])] + a[1:]),
+    numpy.remainder: lambda a, b: RULES[numpy.subtract](
+        a, mul(b, constant([numpy.floor_divide(a[0], b[0])] + a[1:]))),
+    numpy.maximum: maximum,
+    numpy.minimum: minimum,
+}
+
+# Comparisons look at the values only, like in (x > 0) * x
+COMPARISONS = {numpy.greater, numpy.greater_equal, numpy.less,
+               numpy.less_equal, numpy.equal, numpy.not_equal}
+
+class Jet(NDArrayOperatorsMixin):
+    # coeffs[k] is f^(k)(x) / k!, an array or a scalar broadcasting to it
+    def __init__(self, coeffs):
+        self.coeffs = coeffs
+
+    @classmethod
+    def variable(cls, xs, order):
+        return cls([xs, 1.0] + [0.0] * (order - 1))
+
+    @classmethod
+    def lift(cls, value, order):
+        if isinstance(value, Jet): return value
+        return cls([numpy.asarray(value, dtype=float)] + [0.0] * order)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != "__call__" or kwargs: return NotImplemented
+        order = len(self.coeffs) - 1
+        coeffs = [Jet.lift(value, order).coeffs for value in inputs]
+        if ufunc in COMPARISONS:
+            return ufunc(*(c[0] for c in coeffs))
+        if ufunc not in RULES: return NotImplemented
+        return Jet(RULES[ufunc](*coeffs))
+
+    def derivatives(self, shape):
+        # The (order + 1, *shape) array of f, f', ..., f^(order)
+        shape = numpy.broadcast_shapes(shape, *(numpy.shape(c) for c in self.coeffs))
+        return numpy.stack([numpy.broadcast_to(math.factorial(k) * c, shape)
+                            for k, c in enumerate(self.coeffs)])
+
+class JetFunction:
+    # Another function of the table, called by the differentiated one
+    def __init__(self, table, name, x, memo, columns):
+        self.table = table
+        self.string = table.funcs[name]
+        self.x = x
+        self.memo = memo
+        self.columns = columns
+
+    def __call__(self, arg):
+        memo = self.memo if arg is self.x else {}
+        return evaluate_on(self.table, self.string, Jet.lift(arg, len(self.x.coeffs) - 1),
+                           memo, self.columns)
+
+def evaluate_on(table, string, x, memo, columns):
+    if string not in memo:
+        names = {name: columns[name] if name in table.params else
+                 JetFunction(table, name, x, memo, columns)
+                 for name in table.dependencies(string)}
+        code = compiler.compile_expr(string, frozenset(names))
+        with numpy.errstate(all="ignore"):
+            value = eval(code, {"__builtins__": np_math_funcs},
+                         func_generator.make_locals(x, names))
+        memo[string] = Jet.lift(value, len(x.coeffs) - 1)
+    return memo[string]
+
+def evaluate(table, string, xs, order, columns):
+    # f and its derivatives up to order, one row each (families: one block each)
+    shape = numpy.broadcast_shapes(numpy.shape(xs), *(numpy.shape(c) for c in columns.values()))
+    try:
+        jet = evaluate_on(table, string, Jet.variable(xs, order), {}, columns)
+        ys = jet.derivatives(shape).reshape(-1, numpy.shape(xs)[-1])
+
+    except func_generator.VEC_FALLBACK_ERRORS:
+        # Like func_generator.evaluate: point by point, families row by row
+        rows = sweep.iter_rows(columns) if columns else [{}]
+        ys = numpy.stack([evaluate_points(table, string, xs, order, row) for row in rows], 1)
+        ys = ys.reshape(-1, numpy.shape(xs)[-1])
+
+    ys[numpy.isinf(ys)] = math.nan
+    return ys
+
+def evaluate_points(table, string, xs, order, columns):
+    # The (order + 1, len(xs)) derivatives, on one scalar jet per point
+    ys = numpy.full((order + 1, len(xs)), math.nan)
+    for index, x in enumerate(numpy.asarray(xs, dtype=float)):
+        try:
+            jet = evaluate_on(table, string, Jet.variable(x, order), {}, columns)
+            ys[:, index] = jet.derivatives(())
+
+        # Like calc_y: nan where the point is out of the domain
+        except (ArithmeticError, ValueError):
+            pass
+    return ys
@@ -0,0 +1,146 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"""Content addressed on-disk cache of evaluated curves.
+
+Every entry is one file: MAGIC, the crc32 of the payload, and the
+payload, a .npz archive of the x and y arrays, whose shapes depend on
+the kind of curve. Entries are written to a temporary file and renamed,
+so several GUI instances can share the cache; the modification time is
+the last use, for LRU eviction.
+"""
+
+import io
+import os
+import zlib
+import struct
+import hashlib
+import tempfile
+
+import numpy
+
+from compiler import normalize
+from func_generator import ENGINE_VERSION
+
+MAGIC = b"LDVCACH2"
+SUFFIX = ".curve"
+MAX_BYTES = 512 * 1024 * 1024
+
+def default_directory():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ldv-plotter", "curves")
+
+def make_key(string, fingerprint):
+    text = repr((normalize(string), fingerprint, ENGINE_VERSION))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def pack(xs, ys):
+    buffer = io.BytesIO()
+    numpy.savez(buffer, xs=xs, ys=ys)
+    payload = buffer.getvalue()
+    return MAGIC + struct.pack("<I", zlib.crc32(payload)) + payload
+
+def unpack(data):
+    # None if the entry is damaged
+    header_size = len(MAGIC) + 4
+    if data[:len(MAGIC)] != MAGIC: return None
+
+    crc, = struct.unpack("<I", data[len(MAGIC):header_size])
+    payload = data[header_size:]
+    if zlib.crc32(payload) != crc: return None
+    with numpy.load(io.BytesIO(payload)) as arrays:
+        return arrays["xs"], arrays["ys"]
+
+class DiskCache:
+    def __init__(self, directory=None, max_bytes=MAX_BYTES):
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load(self, key):
+        try:
+            with open(self.path(key), "rb") as file:
+                curve = unpack(file.read())
+            os.utime(self.path(key))
+        except OSError:
+            curve = None
+
+        if curve is None: self.misses += 1
+        else: self.hits += 1
+        return curve
+
+    def store(self, key, xs, ys):
+        data = pack(xs, ys)
+        if len(data) > self.max_bytes // 8: return
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self.write(key, data)
+            self.evict()
+        except OSError:
+            pass
+
+    def write(self, key, data):
+        with tempfile.NamedTemporaryFile("wb", dir=self.directory,
+                                         suffix=".tmp", delete=False) as file:
+            file.write(data)
+        os.replace(file.name, self.path(key))
+
+    def entries(self):
+        # (last use, size, path) of every entry, oldest first
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith(SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                pass
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes: break
+            self.remove(path)
+            size -= entry_size
+
+    def remove(self, path):
+        # Another instance may have removed it already
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        if not os.path.isdir(self.directory): return
+        for _, _, path in self.entries():
+            self.remove(path)
+        self.hits = self.misses = 0
+
+    def stats(self):
+        entries = self.entries() if os.path.isdir(self.directory) else []
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(entries), "bytes": sum(e[1] for e in entries),
+                "max_bytes": self.max_bytes, "directory": self.directory}
@@ -0,0 +1,185 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"""Sampled x and y columns, evaluated and written chunk by chunk.
+
+Only one chunk of rows is in memory at a time, whatever the number
+of points. Formats:
+  - csv: a header line, then the rows, with the digits of repr;
+  - npy: a (rows, columns) float64 array, whose header is written
+    first, since the number of rows is known from the x settings;
+  - ldvc: columnar, like Parquet. COLUMNS_MAGIC, then a row group per
+    chunk, storing each column contiguously as little endian float64,
+    then a JSON footer with the column names and the row groups, the
+    footer length as a little endian uint64, and COLUMNS_MAGIC again.
+"""
+
+import os
+import json
+import time
+import struct
+import tempfile
+
+import numpy
+
+import func_generator
+from grid import x_chunks
+
+CHUNK_ROWS = 1 << 16
+FORMATS = ("csv", "npy", "ldvc")
+COLUMNS_MAGIC = b"LDVC\x01"
+DTYPE = numpy.dtype("<f8")
+
+class CsvWriter:
+    def __init__(self, file, names, rows):
+        # repr: the shortest digits which read back the same float
+        self.file = file
+        self.line = ",".join(["%r"] * len(names)) + "\n"
+        file.write((",".join(names) + "\n").encode())
+
+    def write(self, columns):
+        rows = numpy.column_stack(columns).tolist()
+        self.file.write("".join([self.line % tuple(row) for row in rows]).encode())
+
+    def close(self):
+        pass
+
+class NpyWriter:
+    def __init__(self, file, names, rows):
+        self.file = file
+        header = {"descr": DTYPE.str, "fortran_order": False, "shape": (rows, len(names))}
+        numpy.lib.format.write_array_header_1_0(file, header)
+
+    def write(self, columns):
+        self.file.write(numpy.column_stack(columns).astype(DTYPE, copy=False).tobytes())
+
+    def close(self):
+        pass
+
+class ColumnsWriter:
+    def __init__(self, file, names, rows):
+        self.file = file
+        self.names = names
+        self.row_groups = []
+        file.write(COLUMNS_MAGIC)
+
+    def write(self, columns):
+        self.row_groups.append({"offset": self.file.tell(), "rows": len(columns[0])})
+        for column in columns:
+            self.file.write(numpy.asarray(column, dtype=DTYPE).tobytes())
+
+    def close(self):
+        footer = json.dumps({"version": 1, "columns": self.names,
+                             "row_groups": self.row_groups}).encode()
+        self.file.write(footer + struct.pack("<Q", len(footer)) + COLUMNS_MAGIC)
+
+WRITERS = {"csv": CsvWriter, "npy": NpyWriter, "ldvc": ColumnsWriter}
+
+def get_format(filename):
+    # From the extension, CSV by default
+    extension = os.path.splitext(filename)[1][1:].lower()
+    return extension if extension in FORMATS else "csv"
+
+def read_footer(file):
+    file.seek(-len(COLUMNS_MAGIC) - 8, os.SEEK_END)
+    length, = struct.unpack("<Q", file.read(8))
+    if file.read() != COLUMNS_MAGIC:
+        raise ValueError(f"{file.name} is not a columns file")
+    file.seek(-len(COLUMNS_MAGIC) - 8 - length, os.SEEK_END)
+    return json.loads(file.read(length))
+
+def read_column(filename, name):
+    # Reads only the column, row group by row group
+    with open(filename, "rb") as file:
+        footer = read_footer(file)
+        index = footer["columns"].index(name)
+        parts = []
+        for group in footer["row_groups"]:
+            file.seek(group["offset"] + index * group["rows"] * DTYPE.itemsize)
+            parts.append(numpy.fromfile(file, DTYPE, group["rows"]))
+    return numpy.concatenate(parts) if parts else numpy.empty(0, DTYPE)
+
+def column_names(name, string, table):
+    # A family, like a function with its derivatives, has a column per row
+    shape = table.shape(string, 1)
+    if len(shape) < 2: return [name]
+    return [f"{name}[{row}]" for row in range(shape[0])]
+
+class Exporter:
+    # functions is a list of (name, string) couples, x_settings
+    # (start, end, n_points); report is called after every chunk
+    def __init__(self, functions, table, x_settings, report=None):
+        self.functions = functions
+        self.table = table
+        self.x_settings = x_settings
+        self.report = report
+        self.errors = {}
+        self.rows = 0
+        self.seconds = 0.0
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def get_names(self):
+        return ["x"] + [column for name, string in self.functions
+                        for column in column_names(name, string, self.table)]
+
+    def export(self, filename, fmt):
+        # Written to a temporary file, which replaces filename once complete:
+        # a cancelled export removes its own file only, never a newer export
+        directory = os.path.dirname(os.path.abspath(filename))
+        with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as file:
+            try:
+                self.write(file, fmt)
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+
+        if self.cancelled:
+            os.remove(file.name)
+            return False
+        os.replace(file.name, filename)
+        return True
+
+    def write(self, file, fmt):
+        started = time.perf_counter()
+        writer = WRITERS[fmt](file, self.get_names(), self.x_settings[2] + 1)
+        for first, xs in x_chunks(*self.x_settings, CHUNK_ROWS):
+            writer.write(self.evaluate_chunk(xs))
+            self.rows, self.seconds = first + len(xs), time.perf_counter() - started
+            if self.report: self.report(self.rows, self.x_settings[2] + 1, self.seconds)
+            if self.cancelled: return
+        writer.close()
+
+    def evaluate_chunk(self, xs):
+        # A failed function gets nan from the failing chunk on
+        columns, memo = [xs], {}
+        for name, string in self.functions:
+            ys = numpy.full(self.table.shape(string, len(xs)), numpy.nan)
+            if name not in self.errors:
+                try:
+                    ys[...] = self.table.evaluate(string, xs, memo)
+                except func_generator.FUNCS_EXECUTION_ERRORS as error:
+                    self.errors[name] = error
+            columns.extend(numpy.atleast_2d(ys))
+        return columns
+
+def format_throughput(rows, seconds):
+    rate = rows / seconds if seconds else 0.0
+    return f"{rows} rows, {rate / 1e6:.2f} M rows/s"
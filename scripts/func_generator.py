@@ -16,20 +16,104 @@
 # Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
 
 import math_funcs
+import np_math_funcs
+import compiler
+import numpy
 import math
 
-def generate_func(string):
+# Errors that make the vectorized engine give up and use calc_y;
+# ArithmeticError comes from Python scalar subterms, like 1/0
+VEC_FALLBACK_ERRORS = (TypeError, ValueError, ArithmeticError)
+
+# Bump it when a change makes the engines return different values:
+# it invalidates the curves in the disk cache
+ENGINE_VERSION = 3
+
+# Number of points evaluated at once by the plot jobs
+CHUNK_SIZE = 1 << 16
+
+FUNCS_EXECUTION_ERRORS = (
+    ArithmeticError,
+    SyntaxError,
+    NameError,
+    TypeError,
+    ValueError)
+
+def make_locals(x, names):
+    # names maps the other functions a composed expression can call
+    return {"x":x, **names} if names else {"x":x}
+
+def generate_func(string, names=None):
+    code = compiler.compile_expr(string, frozenset(names or ()))
+
     def calc_y(x):
         try:
-            return eval(string, {'__builtins__':math_funcs}, {"x":x})
+            return eval(code, {'__builtins__':math_funcs}, make_locals(x, names))
             
-        except ArithmeticError:
+        # ValueError is the "math domain error" of sqrt, log and pow
+        except (ArithmeticError, ValueError):
             return math.nan
         
     return calc_y
-            
+
+def generate_vec_func(string, names=None):
+    code = compiler.compile_expr(string, frozenset(names or ()))
+
+    def calc_ys(xs):
+        with numpy.errstate(all="ignore"):
+            ys = eval(code, {'__builtins__':np_math_funcs}, make_locals(xs, names))
+
+        return to_y_array(ys, xs)
+
+    return calc_ys
+
+def to_y_array(ys, xs):
+    ys = numpy.broadcast_to(ys, numpy.shape(xs))
+
+    # Python gives complex numbers, like (-4)**0.5, where numpy gives nan
+    if numpy.iscomplexobj(ys):
+        ys = numpy.where(ys.imag == 0, ys.real, math.nan)
+    ys = numpy.array(ys, dtype=float)
+
+    # calc_y turns ZeroDivisionError and OverflowError into nan,
+    # numpy turns them into inf: keep the two engines in agreement
+    ys[numpy.isinf(ys)] = math.nan
+    return ys
+
+def evaluate(string, xs, names=None):
+    calc_ys = generate_vec_func(string, names)
+    try:
+        return calc_ys(xs)
+
+    except VEC_FALLBACK_ERRORS:
+        # The scalar engine walks 1-D grids: families retry row by row
+        if numpy.ndim(xs) > 1: raise
+        return evaluate_scalar(string, xs, names)
+
+def evaluate_scalar(string, xs, names=None):
+    foo = generate_func(string, names)
+    ys = [foo(x) for x in numpy.asarray(xs, dtype=float).tolist()]
+    return to_y_array(ys, xs)
+
 if __name__ == "__main__":
-    f = generate_func(input("y = "))
-    
-    for num in range(100):
-        print(f(num))
+    # Engine check: the vectorized engine, called directly so that it
+    # cannot fall back, gives the values of the scalar one
+    STRINGS = ("x**2 - 3*x + 1", "sin(x) / x", "sqrt(x)", "log(x)", "x**0.5",
+               "1 / (x - 2)", "e**(x**2)", "floor(x) + ceil(x)", "abs(x) ** 0.5",
+               "max(x, 0)", "cos(x) * pi", "x**0.5 if x < 1 else x")
+    xs = numpy.linspace(-4, 4, 41)
+
+    checked = failed = 0
+    for string in STRINGS:
+        try:
+            with numpy.errstate(all="ignore"):
+                vec_ys = to_y_array(generate_vec_func(string)(xs), xs)
+        except VEC_FALLBACK_ERRORS:
+            print("scalar only:", string)
+            continue
+
+        same = numpy.allclose(vec_ys, evaluate_scalar(string, xs), equal_nan=True)
+        if not same: print("different:", string)
+        checked, failed = checked + 1, failed + (not same)
+
+    print(f"engines agree on {checked - failed}/{checked} expressions")
@@ -0,0 +1,60 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"The x grid shared by all the functions of a plot"
+
+import numpy
+
+def build_x(start, end, n_points):
+    # n_points steps from start to end, both included. Every point is
+    # computed from its index, so there is no accumulated drift
+    xs = numpy.linspace(start, end, n_points + 1, dtype=numpy.float64)
+    xs.flags.writeable = False
+    return xs
+
+class XGrid:
+    def __init__(self):
+        self.settings = None
+        self.xs = None
+        self.builds = 0
+
+    def get(self, start, end, n_points):
+        settings = (float(start), float(end), int(n_points))
+        if self.xs is None or settings != self.settings:
+            self.xs = build_x(*settings)
+            self.settings = settings
+            self.builds += 1
+
+        return self.xs
+
+    def invalidate(self):
+        self.settings = None
+        self.xs = None
+
+def x_chunk(start, end, n_points, first, stop):
+    # The points [first, stop) of build_x(start, end, n_points)
+    step = (end - start) / n_points if n_points else 0.0
+    xs = start + numpy.arange(first, stop, dtype=numpy.float64) * step
+    if n_points and stop == n_points + 1:
+        xs[-1] = end
+    return xs
+
+def x_chunks(start, end, n_points, chunk_size=1 << 16, first=0, stop=None):
+    stop = n_points + 1 if stop is None else stop
+    for index in range(first, stop, chunk_size):
+        yield index, x_chunk(start, end, n_points, index,
+                             min(index + chunk_size, stop))
@@ -0,0 +1,326 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"""Implicit curves F(x, y) = 0 and heatmaps of z = f(x, y).
+
+Both start from a coarse grid, evaluated in one vectorized pass, and
+refine as a quadtree only the cells where F changes sign, or where z
+varies by more than a color level. Points live on an integer lattice,
+so the corners shared by neighbouring cells are evaluated once, and the
+evaluations never exceed the budget. Implicit curves come out of
+marching squares on the leaf cells, heatmaps are painted on an image.
+"""
+
+import re
+import ast
+import math
+import functools
+import itertools
+
+import numpy
+
+import compiler
+import func_generator
+from composition import EMPTY_TABLE, RowFunction
+
+INITIAL_CELLS = 32
+MAX_DEPTH = 8
+COLOR_LEVELS = 64
+COLORMAP = "viridis"
+
+# n_points is the evaluations budget, but 1-D grids may have millions of
+# points: more evaluations than this don't show on a screen
+MAX_EVALUATIONS = 1 << 18
+
+# Heatmaps are drawn as an image, no finer than the smallest cell
+MAX_IMAGE_SIDE = 1024
+
+# A single "=", not part of "==", "<=", ">=" or "!="
+# The = of an equation: not ==, <=, >=, != or :=, nor a keyword argument
+EQUATION = re.compile(r"(?<![=<>!:])=(?!=)")
+
+def surface_budget(n_points):
+    return min(n_points + 1, MAX_EVALUATIONS)
+
+def equation_signs(string):
+    # The positions of the = signs outside any parentheses
+    depths = list(itertools.accumulate((char in "([{") - (char in ")]}") for char in string))
+    return [match.start() for match in EQUATION.finditer(string) if depths[match.start()] == 0]
+
+def is_equation(string):
+    return len(equation_signs(string)) == 1
+
+def to_expression(string):
+    # "x**2 + y**2 = 1" -> "(x**2 + y**2) - (1)"
+    if not is_equation(string): return string
+    sign, = equation_signs(string)
+    return f"({string[:sign]}) - ({string[sign + 1:]})"
+
+@functools.lru_cache(maxsize=256)
+def is_2d(string):
+    if is_equation(string): return True
+    try:
+        tree = ast.parse(compiler.normalize(string), mode="eval")
+    except SyntaxError:
+        return False
+    return any(isinstance(node, ast.Name) and node.id == "y" for node in ast.walk(tree))
+
+def compile_args(string, names=frozenset()):
+    # What compiler gets, knowing y and the equations of 2-D functions
+    if is_2d(string):
+        return to_expression(string), names | {"y"}
+    return string, names
+
+def compile_expr(string, names=frozenset()):
+    return compiler.compile_expr(*compile_args(string, names))
+
+def count_operations(string, names=frozenset()):
+    return compiler.count_operations(*compile_args(string, names))
+
+def evaluate(string, xs, ys, table=EMPTY_TABLE):
+    # string on the points (xs, ys); it can call the functions of table
+    names = {name: RowFunction(table, name, xs, {}, {})
+             for name in table.dependencies(string) if name in table.funcs}
+    names["y"] = ys
+    try:
+        return func_generator.generate_vec_func(string, names)(xs)
+
+    except func_generator.VEC_FALLBACK_ERRORS:
+        return evaluate_scalar(string, xs, ys, names)
+
+def evaluate_scalar(string, xs, ys, names):
+    # calc_y reads names when called: y is set point by point
+    calc_z = func_generator.generate_func(string, names)
+    zs = []
+    for x, names["y"] in zip(xs.tolist(), ys.tolist()):
+        zs.append(calc_z(x))
+    return func_generator.to_y_array(zs, xs)
+
+class QuadtreeSampler:
+    def __init__(self, string, x_range, y_range, table=EMPTY_TABLE):
+        self.implicit = is_equation(string)
+        self.string = to_expression(string)
+        self.x_range = x_range
+        self.y_range = y_range
+        self.table = table
+        self.keys = numpy.empty(0, dtype=numpy.int64)
+        self.values = numpy.empty(0)
+        self.n_cells = 0
+
+    @property
+    def evaluations(self):
+        return len(self.keys)
+
+    @property
+    def nans(self):
+        return int(numpy.count_nonzero(numpy.isnan(self.values)))
+
+    def plot(self, max_evals):
+        # Implicit curves: a nan separated polyline; heatmaps: cells and values
+        cells = self.sample(max_evals)
+        self.n_cells = len(cells[0])
+        return self.contour(cells) if self.implicit else self.heatmap(cells)
+
+    def sample(self, max_evals):
+        # The leaf cells, as (i, j, size) arrays on the lattice
+        n = max(min(INITIAL_CELLS, math.isqrt(max(max_evals, 4)) - 1), 1)
+        size = 1 << MAX_DEPTH
+        self.side = n * size
+        i, j = numpy.meshgrid(numpy.arange(n) * size, numpy.arange(n) * size, indexing="ij")
+        cells = (i.ravel(), j.ravel(), numpy.full(n * n, size))
+        self.evaluate_cells(cells)
+
+        for _ in range(MAX_DEPTH):
+            chosen = self.choose(cells, max_evals)
+            if not len(chosen): break
+            cells = self.split(cells, chosen)
+            self.evaluate_cells(cells)
+        return cells
+
+    def to_xy(self, i, j):
+        (x0, x1), (y0, y1) = self.x_range, self.y_range
+        return x0 + (x1 - x0) * i / self.side, y0 + (y1 - y0) * j / self.side
+
+    def corner_keys(self, cells):
+        # The corners (0, 0), (1, 0), (0, 1), (1, 1) of every cell
+        i, j, size = cells
+        row = self.side + 1
+        return [(i + di * size) * row + j + dj * size for di, dj in ((0, 0), (1, 0), (0, 1), (1, 1))]
+
+    def evaluate_cells(self, cells):
+        keys = numpy.unique(numpy.concatenate(self.corner_keys(cells)))
+        missing = keys[~numpy.isin(keys, self.keys)]
+        values = evaluate(self.string, *self.to_xy(*numpy.divmod(missing, self.side + 1)), self.table)
+
+        keys = numpy.concatenate((self.keys, missing))
+        order = numpy.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.values = numpy.concatenate((self.values, values))[order]
+
+    def corner_values(self, cells):
+        return numpy.stack([self.values[numpy.searchsorted(self.keys, keys)]
+                            for keys in self.corner_keys(cells)])
+
+    def choose(self, cells, max_evals):
+        # Splitting a cell costs five points at most: the budget is never exceeded
+        affordable = (max_evals - self.evaluations) // 5
+        if affordable <= 0: return numpy.empty(0, dtype=numpy.int64)
+
+        values = self.corner_values(cells)
+        spread = numpy.fmax.reduce(values) - numpy.fmin.reduce(values)
+        candidates = numpy.flatnonzero(self.is_interesting(values, spread) & (cells[2] > 1))
+        order = numpy.argsort(-numpy.nan_to_num(spread[candidates], nan=numpy.inf), kind="stable")
+        return candidates[order[:affordable]]
+
+    def is_interesting(self, values, spread):
+        # A nan on only some corners is a domain edge: refine it too
+        nans = numpy.isnan(values)
+        edges = nans.any(axis=0) & ~nans.all(axis=0)
+        if self.implicit:
+            return edges | ((numpy.fmin.reduce(values) <= 0) & (numpy.fmax.reduce(values) > 0))
+
+        finite = self.values[numpy.isfinite(self.values)]
+        tolerance = (finite.max() - finite.min()) / COLOR_LEVELS if len(finite) else numpy.inf
+        with numpy.errstate(invalid="ignore"):
+            return edges | (spread > tolerance)
+
+    def split(self, cells, chosen):
+        i, j, size = cells
+        keep = numpy.ones(len(i), dtype=bool)
+        keep[chosen] = False
+        ci, cj, half = i[chosen], j[chosen], size[chosen] // 2
+
+        return (numpy.concatenate((i[keep], ci, ci + half, ci, ci + half)),
+                numpy.concatenate((j[keep], cj, cj, cj + half, cj + half)),
+                numpy.concatenate((size[keep], numpy.tile(half, 4))))
+
+    def heatmap(self, cells):
+        # (n, 4) x_lo, x_hi, y_lo, y_hi bounds, and the mean of the corners
+        i, j, size = cells
+        x_lo, y_lo = self.to_xy(i, j)
+        x_hi, y_hi = self.to_xy(i + size, j + size)
+        return numpy.stack((x_lo, x_hi, y_lo, y_hi), axis=1), self.corner_values(cells).mean(axis=0)
+
+    def contour(self, cells):
+        # Marching squares, cell by cell
+        values = self.corner_values(cells)
+        xs, ys = self.edge_points(cells, values)
+        crosses = self.edge_crossings(values)
+        return join_segments(xs, ys, *self.segment_edges(values, crosses))
+
+    def edge_points(self, cells, values):
+        # Where F is 0 on the bottom, right, top and left edges
+        i, j, size = cells
+        x_lo, y_lo = self.to_xy(i, j)
+        x_hi, y_hi = self.to_xy(i + size, j + size)
+        v00, v10, v01, v11 = values
+        with numpy.errstate(all="ignore"):
+            t = [v00 / (v00 - v10), v10 / (v10 - v11), v01 / (v01 - v11), v00 / (v00 - v01)]
+        xs = numpy.stack((x_lo + t[0] * (x_hi - x_lo), x_hi, x_lo + t[2] * (x_hi - x_lo), x_lo), 1)
+        ys = numpy.stack((y_lo, y_lo + t[1] * (y_hi - y_lo), y_hi, y_lo + t[3] * (y_hi - y_lo)), 1)
+        return xs, ys
+
+    def edge_crossings(self, values):
+        v00, v10, v01, v11 = values > 0
+        crosses = numpy.stack((v00 != v10, v10 != v11, v01 != v11, v00 != v01), 1)
+        crosses[numpy.isnan(values).any(axis=0)] = False
+        return crosses
+
+    def segment_edges(self, values, crosses):
+        # Two crossed edges make a segment; four are a saddle, split by the center
+        n_crosses = crosses.sum(axis=1)
+        first = numpy.argmax(crosses, axis=1)
+        last = 3 - numpy.argmax(crosses[:, ::-1], axis=1)
+        pairs = n_crosses == 2
+
+        saddles = n_crosses == 4
+        joined = ((values.mean(axis=0) > 0) == (values[0] > 0))[:, None]
+        saddle_first = numpy.where(joined, [[0, 2]], [[3, 1]])[saddles]
+        saddle_second = numpy.where(joined, [[1, 3]], [[0, 2]])[saddles]
+        return ((numpy.flatnonzero(pairs), first[pairs], last[pairs]),
+                (numpy.flatnonzero(saddles), saddle_first, saddle_second))
+
+def join_segments(xs, ys, first, second):
+    # Segments as one polyline, separated by nans, drawable by a Line2D
+    (pair_cells, pair_a, pair_b), (saddle_cells, saddle_a, saddle_b) = first, second
+    cells = numpy.concatenate((pair_cells, numpy.repeat(saddle_cells, 2)))
+    a = numpy.concatenate((pair_a, saddle_a.ravel()))
+    b = numpy.concatenate((pair_b, saddle_b.ravel()))
+
+    nans = numpy.full(len(cells), numpy.nan)
+    return (numpy.stack((xs[cells, a], xs[cells, b], nans), 1).ravel(),
+            numpy.stack((ys[cells, a], ys[cells, b], nans), 1).ravel())
+
+def heatmap_limits(cells):
+    # The corners of the cells, for Axes.update_datalim
+    if not len(cells): return numpy.empty((0, 2))
+    return [(cells[:, 0].min(), cells[:, 2].min()), (cells[:, 1].max(), cells[:, 3].max())]
+
+def heatmap_extent(cells):
+    if not len(cells): return 0.0, 1.0, 0.0, 1.0
+    (x0, y0), (x1, y1) = heatmap_limits(cells)
+    return x0, x1, y0, y1
+
+def image_side(lo, hi, start, end):
+    # The pixels along an axis: as many as the smallest cells need
+    smallest = numpy.min(hi - lo)
+    if smallest <= 0: return 1
+    return int(min(max(round((end - start) / smallest), 1), MAX_IMAGE_SIDE))
+
+def pixel_ranges(lo, hi, start, end, side):
+    # The first pixel of every cell, and how many pixels it covers
+    scale = side / (end - start) if end > start else 0.0
+    first = numpy.clip(numpy.round((lo - start) * scale).astype(numpy.int64), 0, side - 1)
+    stop = numpy.clip(numpy.round((hi - start) * scale).astype(numpy.int64), first + 1, side)
+    return first, stop - first
+
+def rasterize(cells, values):
+    # An (x, y) image of the leaf cells; where cells are smaller than a
+    # pixel, the smallest ones are painted last
+    if not len(cells): return numpy.full((1, 1), numpy.nan)
+    x0, x1, y0, y1 = heatmap_extent(cells)
+    shape = (image_side(cells[:, 0], cells[:, 1], x0, x1),
+             image_side(cells[:, 2], cells[:, 3], y0, y1))
+    i, width = pixel_ranges(cells[:, 0], cells[:, 1], x0, x1, shape[0])
+    j, height = pixel_ranges(cells[:, 2], cells[:, 3], y0, y1, shape[1])
+
+    # Cells of a size are painted together, the biggest first
+    image = numpy.full(shape, numpy.nan)
+    blocks = numpy.stack((width, height), axis=1)
+    for w, h in sorted(set(map(tuple, blocks.tolist())), reverse=True):
+        chosen = numpy.flatnonzero((width == w) & (height == h))
+        rows = i[chosen, None, None] + numpy.arange(w)[None, :, None]
+        columns = j[chosen, None, None] + numpy.arange(h)[None, None, :]
+        image[rows, columns] = values[chosen, None, None]
+    return image
+
+def set_heatmap_data(image, cells, values):
+    image.set_data(rasterize(cells, values).T)
+    image.set_extent(heatmap_extent(cells))
+    finite = values[numpy.isfinite(values)]
+    if len(finite): image.set_clim(finite.min(), finite.max())
+
+def add_heatmap(ax, cells, values, **kwargs):
+    # One image for all the leaf cells, whatever their number
+    from matplotlib.image import AxesImage
+
+    image = AxesImage(ax, cmap=COLORMAP, origin="lower", interpolation="nearest", **kwargs)
+    set_heatmap_data(image, cells, values)
+    ax.add_image(image)
+    ax.update_datalim(heatmap_limits(cells))
+    ax.autoscale_view()
+    return image
@@ -0,0 +1,112 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"Per stage timings of the hot paths, exportable in Chrome trace-event format"
+
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+
+MAX_EVENTS = 100000
+
+class Tracer:
+    # Spans end in the GUI thread and in the jobs: the lock guards the dicts
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.stages = {}
+        self.funcs = {}
+        self.operations = None
+
+    def now(self):
+        return time.perf_counter_ns() // 1000
+
+    def add_event(self, event):
+        event.update(pid=os.getpid(), tid=threading.get_ident())
+        with self.lock:
+            self.events.append(event)
+            if len(self.events) > MAX_EVENTS:
+                del self.events[:len(self.events) // 2]
+
+    @contextmanager
+    def span(self, name, **args):
+        # args can be filled in by the traced block
+        start = self.now()
+        try:
+            yield args
+        finally:
+            duration = self.now() - start
+            with self.lock:
+                self.stages[name] = duration / 1e6
+            self.add_event({"name": name, "ph": "X", "ts": start,
+                            "dur": duration, "args": args})
+
+    def count_func(self, string, evaluations, nans, **counts):
+        # counts: the quadtree cells of 2-D functions
+        stats = {"evaluations": evaluations, "nans": nans, **counts}
+        with self.lock:
+            self.funcs[string] = stats
+        self.add_event({"name": "evaluated", "ph": "i", "s": "t", "ts": self.now(),
+                        "args": {"function": string, **stats}})
+
+    def count_operations(self, before, after):
+        # Of the plotted expressions, before and after the optimizer
+        self.operations = (before, after)
+
+    def reset_plot(self):
+        with self.lock:
+            self.stages.clear()
+            self.funcs.clear()
+            self.operations = None
+
+    def summary(self):
+        with self.lock:
+            stages, funcs = list(self.stages.items()), list(self.funcs.values())
+        stages = " · ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in stages)
+        nans = sum(stats["nans"] for stats in funcs)
+        evaluations = sum(stats["evaluations"] for stats in funcs)
+        cells = sum(stats.get("cells", 0) for stats in funcs)
+        cells = f", {cells} cells" if cells else ""
+        operations = (f", {self.operations[0]} → {self.operations[1]} operations"
+                      if self.operations else "")
+        return f"{stages}\n{evaluations} evaluations, {nans} nan{cells}{operations}"
+
+    def export(self, filename):
+        with self.lock:
+            events = list(self.events)
+        with open(filename, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+class Profiler:
+    # cProfile only sees the thread it is enabled in
+    def __init__(self, filename):
+        self.filename = filename
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+        pstats.Stats(self.profile).dump_stats(self.filename)
+
+TRACER = Tracer()
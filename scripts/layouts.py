@@ -17,12 +17,10 @@
 
 import sys
 from PySide2 import QtWidgets, QtCore, QtGui
-import matplotlib.pyplot as plt
-
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
 from costum_widgets import VerticalCostumLayout, CostumEntry, MainMenu
+from parallel import DEFAULT_WORKERS
+from blitting import BlitManager
 
 class MainLayout(QtWidgets.QGridLayout):
     def __init__(self, parent):
@@ -37,7 +35,6 @@ class MainLayout(QtWidgets.QGridLayout):
     def create_widgets(self):
         self.right_layout = RightLayout(self.parent)
         self.matplot_layout = MatplotLayout(self.parent)
-        self.create_ax()
         self.menu = MainMenu(self.parent)
 
     def add_widgets(self):
@@ -48,12 +45,27 @@ class MainLayout(QtWidgets.QGridLayout):
     def add_app_func(self, app_func):
         self.right_layout.funcs.add_app_func(app_func)
 
+    def load_plotting(self):
+        if not self.matplot_layout.is_loaded():
+            self.matplot_layout.load()
+            self.create_ax()
+
+    def get_figure(self):
+        # Whoever needs the figure before it is loaded, loads it
+        self.load_plotting()
+        return self.matplot_layout.plt_figure
+
     def clear_plt(self):
-        self.matplot_layout.plt_figure.clear()
+        self.get_figure().clear()
+
+    def get_ax(self):
+        axes = self.get_figure().axes
+        return axes[0] if axes else self.create_ax()
 
     def create_ax(self):
-        ax = self.matplot_layout.plt_figure.add_subplot()
+        ax = self.get_figure().add_subplot()
         ax.set_facecolor((0,0,0,0))
+        self.set_labels(ax)
 
         return ax
 
@@ -73,37 +85,123 @@ class MainLayout(QtWidgets.QGridLayout):
         self.right_layout.tools.x_start.setValue(float(x_settings[0]))
         self.right_layout.tools.x_end.setValue(float(x_settings[1]))
         self.right_layout.tools.points_range.setValue(float(x_settings[2]))
- 
+
+    def get_y_range(self):
+        tools = self.right_layout.tools
+        return (tools.y_start.value(), tools.y_end.value())
+
+    def set_y_range(self, y_range):
+        self.right_layout.tools.y_start.setValue(float(y_range[0]))
+        self.right_layout.tools.y_end.setValue(float(y_range[1]))
+
+    def is_adaptive(self):
+        return self.right_layout.tools.adaptive.isChecked()
+
+    def is_live_preview(self):
+        return self.right_layout.tools.live_preview.isChecked()
+
+    def get_canvas(self):
+        self.load_plotting()
+        return self.matplot_layout.canvas
+
+    def set_readout(self, text):
+        self.matplot_layout.readout.setText(text)
+
+    def get_blitter(self):
+        self.load_plotting()
+        return self.matplot_layout.blitter
+
+    def get_canvas_width(self):
+        return self.get_canvas().width()
+
+    def get_canvas_height(self):
+        return self.get_canvas().height()
+
+    def set_samples_count(self, n_samples):
+        self.right_layout.tools.samples_count.setText(f"{n_samples} samples")
+
+    def set_timings(self, text):
+        self.right_layout.timings.setText(text)
+
+    def show_timings(self, shown):
+        self.right_layout.timings.setVisible(shown)
+
+    def get_analysis_panel(self):
+        return self.right_layout.analysis
+
+    def set_progress(self, value, text="%p%"):
+        self.right_layout.progress_bar.setValue(value)
+        self.right_layout.progress_bar.setFormat(text)
 
     def reset_ui(self):
         self.right_layout.tools.reset_ui()
-        self.clear_plt()
-        self.update_canvas()
+        if self.matplot_layout.is_loaded():
+            self.clear_plt()
+            self.update_canvas()
 
     def update_canvas(self):
-        plt.xlabel("x")
-        plt.ylabel("y")
-        self.matplot_layout.canvas.draw()
+        # A full draw: the curves are blitted by the canvas draw_event
+        self.get_ax()
+        self.get_canvas().draw()
+
+    def set_labels(self, ax):
+        ax.set_xlabel("x")
+        ax.set_ylabel("y")
+
+def load_plotting_stack():
+    # matplotlib takes most of the startup time: it is imported on demand
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+    from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+
+    return Figure, FigureCanvas, NavigationToolbar
 
 class MatplotLayout(VerticalCostumLayout):
     def create_widgets(self):
-        self.plt_figure = plt.figure()
-        self.canvas = FigureCanvas(self.plt_figure)
-        self.toolbar = NavigationToolbar(self.canvas, self.parent)
+        self.plt_figure = None
+        self.canvas = None
+        self.toolbar = None
+        self.blitter = None
+        self.placeholder = QtWidgets.QLabel("Loading the plot...")
+        self.placeholder.setAlignment(QtCore.Qt.AlignCenter)
 
     def configure_widgets(self):
-        plt.xlabel("x")
-        plt.ylabel("y")
+        # The axes are created and labelled by MainLayout
+        pass
 
     def add_widgets(self):
+        self.addWidget(self.placeholder)
+
+    def is_loaded(self):
+        return self.canvas is not None
+
+    def load(self):
+        Figure, FigureCanvas, NavigationToolbar = load_plotting_stack()
+        self.plt_figure = Figure()
+        self.canvas = FigureCanvas(self.plt_figure)
+        self.toolbar = NavigationToolbar(self.canvas, self.parent)
+        self.blitter = BlitManager(self.canvas)
+        self.readout = QtWidgets.QLabel()
+        self.readout.setSizePolicy(QtWidgets.QSizePolicy.Ignored,
+                                   QtWidgets.QSizePolicy.Preferred)
+
+        self.removeWidget(self.placeholder)
+        self.placeholder.deleteLater()
         self.addWidget(self.toolbar)
         self.addWidget(self.canvas)
+        self.addWidget(self.readout)
 
 class RightLayout(VerticalCostumLayout):
     def create_widgets(self):
         self.tools = ToolsLayout(self.parent)
         self.funcs = AppFuncsLayout()
         self.plot_button = QtWidgets.QPushButton('Plot')
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.timings = QtWidgets.QLabel()
+        self.timings.setWordWrap(True)
+        self.timings.hide()
+        self.analysis = AnalysisPanel(self.parent)
 
     def configure_widgets(self):
         self.plot_button.clicked.connect(self.parent.plot)
@@ -114,6 +212,53 @@ class RightLayout(VerticalCostumLayout):
         self.addLayout(self.tools)
         self.addLayout(self.funcs)
         self.addWidget(self.plot_button)
+        self.addWidget(self.progress_bar)
+        self.addWidget(self.timings)
+        self.addWidget(self.analysis)
+
+class AnalysisPanel(QtWidgets.QGroupBox):
+    # Roots, extrema and integrals of the plotted functions
+    COLUMNS = ("function", "kind", "x", "y")
+
+    def __init__(self, parent):
+        QtWidgets.QGroupBox.__init__(self, "Analysis")
+        self.parent = parent
+        self.create_widgets()
+        self.add_widgets()
+        self.hide()
+
+    def create_widgets(self):
+        self.table = QtWidgets.QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.mark = QtWidgets.QCheckBox("mark on the plot")
+        self.mark.toggled.connect(lambda marked: self.parent.mark_analysis(marked))
+        self.export_button = QtWidgets.QPushButton("Export")
+        self.export_button.clicked.connect(lambda: self.parent.export_analysis())
+
+    def add_widgets(self):
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addWidget(self.mark)
+        buttons.addWidget(self.export_button)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+
+    def set_analyses(self, analyses):
+        rows = [(name, *row) for name, found in analyses for row in found.rows()]
+        self.table.setRowCount(len(rows))
+        for index, row in enumerate(rows):
+            for column, text in enumerate(format_row(*row)):
+                self.table.setItem(index, column, QtWidgets.QTableWidgetItem(text))
+        self.show()
+
+    def is_marked(self):
+        return self.mark.isChecked()
+
+def format_row(name, kind, x, y, error):
+    y_text = f"{y:.10g}" if error is None else f"{y:.10g} ± {error:.2g}"
+    return name, kind, "" if x is None else f"{x:.10g}", y_text
 
 class AppFuncsLayout(QtWidgets.QVBoxLayout):
     def __init__(self, funcs=[]):
@@ -140,13 +285,17 @@ class ToolsLayout(QtWidgets.QFormLayout):
         self.create_x_tools()
         self.create_x_tools_labels()
         self.create_new_func_button()
+        self.connect_x_grid()
         self.config()
 
     def create_x_tools(self):
         self.create_x_start()
         self.create_x_end()
+        self.create_y_range()
         self.create_x_step()
         self.create_points_range()
+        self.create_sampling_tools()
+        self.create_workers()
 
     def create_x_start(self):
         self.x_start = QtWidgets.QDoubleSpinBox()
@@ -162,6 +311,17 @@ class ToolsLayout(QtWidgets.QFormLayout):
         self.x_end.setDecimals(5)
         self.x_end.valueChanged.connect(self.set_num_step)
 
+    def create_y_range(self):
+        # Where the 2-D functions, like x**2 + y**2 = 1, are evaluated
+        self.y_start = QtWidgets.QDoubleSpinBox()
+        self.y_end = QtWidgets.QDoubleSpinBox()
+        for spin_box, value in ((self.y_start, 0), (self.y_end, 100)):
+            spin_box.setRange(-2147483647, 2147483647)
+            spin_box.setDecimals(5)
+            spin_box.setValue(value)
+            spin_box.valueChanged.connect(lambda: self.parent.cancel_plot())
+            spin_box.valueChanged.connect(lambda: self.parent.schedule_preview())
+
     def create_x_step(self):
         self.x_step = CostumEntry(0.1)
 
@@ -171,23 +331,56 @@ class ToolsLayout(QtWidgets.QFormLayout):
         self.points_range.setValue(1000)
         self.points_range.valueChanged.connect(self.set_num_step)
 
+    def create_sampling_tools(self):
+        self.adaptive = QtWidgets.QCheckBox("adaptive sampling")
+        self.live_preview = QtWidgets.QCheckBox("live preview")
+        self.live_preview.toggled.connect(lambda: self.parent.schedule_preview())
+        self.samples_count = QtWidgets.QLabel()
+
+        self.points_box = QtWidgets.QHBoxLayout()
+        self.points_box.addWidget(self.points_range)
+        self.points_box.addWidget(self.samples_count)
+
+    def create_workers(self):
+        self.workers = QtWidgets.QSpinBox()
+        self.workers.setRange(1, 1024)
+        self.workers.setValue(DEFAULT_WORKERS)
+        self.workers.valueChanged.connect(self.parent.set_workers)
+
+    def connect_x_grid(self):
+        for spin_box in (self.x_start, self.x_end, self.points_range):
+            spin_box.valueChanged.connect(lambda: self.parent.x_grid.invalidate())
+            spin_box.valueChanged.connect(lambda: self.parent.cancel_plot())
+            spin_box.valueChanged.connect(lambda: self.parent.schedule_preview())
+
     def create_x_tools_labels(self):
         self.x_start_label = QtWidgets.QLabel("x starts at")
         self.x_end_label = QtWidgets.QLabel("x ends at")
+        self.y_start_label = QtWidgets.QLabel("y starts at")
+        self.y_end_label = QtWidgets.QLabel("y ends at")
         self.x_step_label = QtWidgets.QLabel("steps are of")
         self.points_range_label = QtWidgets.QLabel("№ of points")
+        self.workers_label = QtWidgets.QLabel("№ of workers")
 
 
     def create_new_func_button(self):
         self.new_func_button = QtWidgets.QPushButton('New Func')
         self.new_func_button.clicked.connect(self.parent.create_new_func)
+        self.new_param_button = QtWidgets.QPushButton('New Param')
+        self.new_param_button.clicked.connect(lambda: self.parent.create_new_param())
 
     def config(self):
         l = ((self.x_start_label, self.x_start),
              (self.x_end_label, self.x_end),
-             (self.points_range_label, self.points_range),
+             (self.y_start_label, self.y_start),
+             (self.y_end_label, self.y_end),
+             (self.points_range_label, self.points_box),
+             (QtWidgets.QWidget(), self.adaptive),
+             (QtWidgets.QWidget(), self.live_preview),
              (self.x_step_label, self.x_step),
-             (QtWidgets.QWidget(), self.new_func_button))
+             (self.workers_label, self.workers),
+             (QtWidgets.QWidget(), self.new_func_button),
+             (QtWidgets.QWidget(), self.new_param_button))
 
         for label, effective in l:
             self.addRow(label, effective)
@@ -209,3 +402,6 @@ class ToolsLayout(QtWidgets.QFormLayout):
         self.x_end.setValue(100)
         self.x_step.setValue(0.1)
         self.points_range.setValue(1000)
+        self.y_start.setValue(0)
+        self.y_end.setValue(100)
+        self.samples_count.clear()
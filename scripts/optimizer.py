@@ -0,0 +1,289 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+
+"""An optimizing pass between parsing and compiling expressions.
+
+Three rewrites of the validated tree, which keep the values:
+  - subexpressions which depend on no name but the sandbox constants
+    are folded into constants, once, instead of once per sample;
+  - small integer powers, x**3 or pow(x, 3), become multiplications;
+  - subexpressions written more than once are evaluated once, through
+    := assignments to names no expression can use.
+"""
+
+import ast
+import copy
+import math
+import operator
+
+import numpy
+
+import np_math_funcs
+
+FOLDED_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+                    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv,
+                    ast.Mod: operator.mod, ast.Pow: operator.pow}
+FOLDED_UNARY = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+FOLD_ERRORS = (ArithmeticError, ValueError, TypeError)
+
+# Integer powers of integers grow without bounds: larger ones are not folded
+MAX_FOLDED_EXPONENT = 64
+SMALL_POWERS = (2, 3, 4)
+
+OPERATIONS = (ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.Call, ast.IfExp)
+
+# := can't be used where the first evaluation may be skipped
+BRANCHES = (ast.IfExp, ast.BoolOp, ast.Lambda, ast.NamedExpr, ast.ListComp,
+            ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+def count_operations(tree):
+    return sum(isinstance(node, OPERATIONS) for node in ast.walk(tree))
+
+def is_number(node):
+    return (isinstance(node, ast.Constant) and isinstance(node.value, (int, float))
+            and not isinstance(node.value, bool))
+
+def fold(node, function, *operands):
+    # An ast.Constant, or None if the value is not a finite real number
+    try:
+        with numpy.errstate(all="ignore"):
+            value = function(*(operand.value for operand in operands))
+    except FOLD_ERRORS:
+        return None
+    if not isinstance(value, (int, float)) or isinstance(value, bool): return None
+    if isinstance(value, float) and not math.isfinite(value): return None
+
+    constant = ast.Constant(value)
+    if isinstance(node, ast.Call) or any(hasattr(operand, "original") for operand in operands):
+        constant.original = node
+    return constant
+
+def as_float(value):
+    # The values of the vectorized engine: numpy integers, which overflow,
+    # are left to it
+    return float(value) if isinstance(value, numpy.floating) else None
+
+class Unfolder(ast.NodeTransformer):
+    # The vectorized engine gets numpy scalars from the sandbox functions,
+    # which give inf or nan where Python numbers raise: where folding fails,
+    # the folded calls are written back
+    def visit_Constant(self, node):
+        original = getattr(node, "original", None)
+        return node if original is None else self.generic_visit(original)
+
+class ConstantFolder(ast.NodeTransformer):
+    def __init__(self, names):
+        # names shadow the sandbox ones
+        self.names = names
+
+    def visit_Name(self, node):
+        value = getattr(np_math_funcs, node.id, None)
+        if node.id not in self.names and isinstance(value, float):
+            return ast.Constant(value)
+        return node
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if type(node.op) in FOLDED_UNARY and is_number(node.operand):
+            return fold(node, FOLDED_UNARY[type(node.op)], node.operand) or self.unfold(node)
+        return self.mix(node)
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if type(node.op) not in FOLDED_OPERATORS: return node
+        if not (is_number(node.left) and is_number(node.right)): return self.mix(node)
+        if (isinstance(node.op, ast.Pow) and isinstance(node.right.value, int)
+                and abs(node.right.value) > MAX_FOLDED_EXPONENT): return self.unfold(node)
+        return (fold(node, FOLDED_OPERATORS[type(node.op)], node.left, node.right)
+                or self.unfold(node))
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        function = self.get_sandbox_function(node.func)
+        if function is None or node.keywords or not all(map(is_number, node.args)):
+            return self.mix(node)
+        return fold(node, lambda *args: as_float(function(*args)), *node.args) or self.unfold(node)
+
+    def unfold(self, node):
+        return Unfolder().generic_visit(node)
+
+    def mix(self, node):
+        # Folded values meet arrays, or Python values which stay unfolded
+        return node if is_variable(node, self.names) else self.unfold(node)
+
+    def get_sandbox_function(self, node):
+        if isinstance(node, ast.Name) and node.id not in self.names:
+            function = getattr(np_math_funcs, node.id, None)
+            return function if callable(function) else None
+
+def small_power(node):
+    if is_number(node) and float(node.value) in SMALL_POWERS:
+        return int(node.value)
+
+def is_variable(node, names):
+    # Whether node uses x, y or other functions, not just the sandbox ones
+    return any(isinstance(child, ast.Name)
+               and (child.id in names or not hasattr(np_math_funcs, child.id))
+               for child in ast.walk(node))
+
+class PowerExpander(ast.NodeTransformer):
+    def __init__(self, names, duplicates):
+        # Without duplicates, only names are multiplied by themselves
+        self.names = names
+        self.duplicates = duplicates
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            return self.expand(node.left, node.right) or node
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if (isinstance(node.func, ast.Name) and node.func.id == "pow" and "pow" not in self.names
+                and len(node.args) == 2 and not node.keywords):
+            return self.expand(*node.args) or node
+        return node
+
+    def expand(self, base, exponent):
+        # Powers of x-invariant values are computed once anyway, and
+        # multiplying Python numbers can raise where numpy scalars don't
+        exponent = small_power(exponent)
+        if exponent is None or not is_variable(base, self.names): return None
+        if not (self.duplicates or isinstance(base, ast.Name)): return None
+        # Copies: the nodes of the tree are transformed in place
+        if exponent == 4:
+            square = ast.BinOp(base, ast.Mult(), copy.deepcopy(base))
+            return ast.BinOp(square, ast.Mult(), copy.deepcopy(square))
+        product = base
+        for _ in range(exponent - 1):
+            product = ast.BinOp(product, ast.Mult(), copy.deepcopy(base))
+        return product
+
+class CommonSubexpressions(ast.NodeTransformer):
+    # The first evaluation of a repeated subexpression is assigned,
+    # the following ones read it: children are visited in evaluation order
+    def __init__(self, tree, names):
+        self.counts = {}
+        for node in ast.walk(tree):
+            if isinstance(node, OPERATIONS):
+                key = ast.dump(node)
+                self.counts[key] = self.counts.get(key, 0) + 1
+        self.names = names
+        self.assigned = {}
+        self.index = 0
+
+    def new_name(self):
+        while f"_{self.index}" in self.names: self.index += 1
+        self.index += 1
+        return f"_{self.index - 1}"
+
+    def visit(self, node):
+        if not isinstance(node, OPERATIONS): return self.generic_visit(node)
+        key = ast.dump(node)
+        if key in self.assigned:
+            return ast.Name(self.assigned[key], ast.Load())
+
+        node = self.generic_visit(node)
+        if self.counts[key] < 2: return node
+        self.assigned[key] = self.new_name()
+        return ast.NamedExpr(ast.Name(self.assigned[key], ast.Store()), node)
+
+def optimize(tree, names=frozenset()):
+    # tree is a validated ast.Expression; names the non sandbox ones
+    tree = ConstantFolder(names).visit(tree)
+    can_share = not any(isinstance(node, BRANCHES) for node in ast.walk(tree))
+    tree = PowerExpander(names, can_share).visit(tree)
+    if can_share:
+        tree = CommonSubexpressions(tree, names).visit(tree)
+    return ast.fix_missing_locations(tree)
+
+if __name__ == "__main__":
+    # Property check: on random expressions, with repeated subexpressions,
+    # the optimized code gives the values of the original one, or its error
+    import sys
+    import random
+    import warnings
+    import math_funcs
+    from func_generator import to_y_array, VEC_FALLBACK_ERRORS, FUNCS_EXECUTION_ERRORS
+
+    warnings.simplefilter("ignore", numpy.ComplexWarning)
+
+    LEAVES = ("x", "pi", "e", "2", "3", "0.5", "-1.5", "0")
+    CALLS = ("sqrt", "sin", "cos", "log", "abs", "floor", "ceil")
+    OPERATORS = ("+", "-", "*", "/", "**")
+
+    def random_expression(rng, depth, pool):
+        if pool and rng.random() < 0.2: return rng.choice(pool)
+        if depth == 0: return rng.choice(LEAVES)
+        kind, sub = rng.random(), lambda: random_expression(rng, depth - 1, pool)
+        if kind < 0.3: string = f"{rng.choice(CALLS)}({sub()})"
+        elif kind < 0.4: string = f"pow({sub()}, {rng.choice((2, 3, 4, 0.5))})"
+        elif kind < 0.5: string = f"({sub()}) ** {rng.choice((2, 3, 4, 2.0))}"
+        elif kind < 0.55: string = f"max({sub()}, {sub()})"
+        else: string = f"({sub()}) {rng.choice(OPERATORS)} ({sub()})"
+        pool.append(string)
+        return string
+
+    def evaluate(code, xs):
+        # Like func_generator.evaluate: vectorized, else point by point
+        try:
+            with numpy.errstate(all="ignore"):
+                ys = eval(code, {"__builtins__": np_math_funcs}, {"x": xs})
+            return to_y_array(ys, xs)
+        except VEC_FALLBACK_ERRORS:
+            return to_y_array([evaluate_at(code, x) for x in xs.tolist()], xs)
+
+    def evaluate_at(code, x):
+        try:
+            return eval(code, {"__builtins__": math_funcs}, {"x": x})
+        except (ArithmeticError, ValueError):
+            return math.nan
+
+    def run(tree, xs):
+        try:
+            return evaluate(compile(tree, "<expression>", "eval"), xs)
+        except FUNCS_EXECUTION_ERRORS as error:
+            return type(error)
+
+    def check(string, xs):
+        original = run(ast.parse(string, mode="eval"), xs)
+        optimized = run(optimize(ast.parse(string, mode="eval")), xs)
+        if isinstance(original, type) or isinstance(optimized, type):
+            return original is optimized
+
+        # Rounding changes ill-conditioned values, like cos(x**16), at will:
+        # they are the ones moving x by a few thousand ulps changes
+        agree = numpy.isclose(original, optimized, rtol=1e-9, atol=1e-12, equal_nan=True)
+        for step in (-1e-12, 1e-12):
+            moved = run(ast.parse(string, mode="eval"), xs + step * numpy.fmax(abs(xs), 1))
+            if isinstance(moved, numpy.ndarray):
+                agree |= ~numpy.isclose(original, moved, rtol=1e-9, atol=1e-12, equal_nan=True)
+        return agree.all()
+
+    rng = random.Random(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    xs = numpy.linspace(-4, 4, 41)
+    strings = [random_expression(rng, rng.randint(1, 5), []) for _ in range(2000)]
+    failed = [string for string in strings if not check(string, xs)]
+    for string in failed[:10]:
+        print("different:", string)
+
+    before = sum(count_operations(ast.parse(s, mode="eval")) for s in strings)
+    after = sum(count_operations(optimize(ast.parse(s, mode="eval"))) for s in strings)
+    print(f"{len(strings) - len(failed)}/{len(strings)} expressions agree, "
+          f"{before} -> {after} operations")
@@ -0,0 +1,104 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"Evaluate functions on a process pool, decimating the curves in the workers"
+
+import os
+import multiprocessing
+from concurrent import futures
+
+import func_generator
+from decimation import M4Reducer, decimate_range
+from composition import EMPTY_TABLE
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Below this number of points the pool costs more than it gives
+PARALLEL_MIN_POINTS = 1 << 20
+
+def decimate_chunk(task):
+    string, table, x_settings, width, row, first, stop = task
+    try:
+        return row, decimate_range(string, x_settings, width, first, stop, table), None
+
+    except func_generator.FUNCS_EXECUTION_ERRORS as error:
+        return row, None, error
+
+class ParallelEvaluator:
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self.executor = None
+
+    def is_worth(self, n_funcs, n_points):
+        return self.workers > 1 and n_funcs * n_points >= PARALLEL_MIN_POINTS
+
+    def get_executor(self):
+        # spawn, because forking a process with running Qt threads is unsafe
+        if not self.executor:
+            context = multiprocessing.get_context("spawn")
+            self.executor = futures.ProcessPoolExecutor(self.workers, context)
+        return self.executor
+
+    def chunk_size(self, n_funcs, n_points):
+        # About four chunks per worker, to keep all of them busy until the end
+        n_chunks = max(4 * self.workers // max(n_funcs, 1), 1)
+        return max(-(-n_points // n_chunks), 1 << 14)
+
+    def make_decimate_tasks(self, strings, x_settings, width, table):
+        n_points = x_settings[2] + 1
+        size = self.chunk_size(len(strings), n_points)
+        return [(string, table, x_settings, width, row, first, min(first + size, n_points))
+                for row, string in enumerate(strings)
+                for first in range(0, n_points, size)]
+
+    def evaluate_decimated(self, strings, x_settings, width, table=EMPTY_TABLE,
+                           progress=None, cancelled=None):
+        # Workers send back M4 reducers, whose size depends only on width
+        tasks = self.make_decimate_tasks(strings, x_settings, width, table)
+        done = self.run_tasks(decimate_chunk, tasks, progress, cancelled)
+        if done is None: return None
+
+        reducers = [M4Reducer(x_settings[0], x_settings[1], width) for _ in strings]
+        errors = {}
+        for row, reducer, error in done:
+            if error: errors.setdefault(row, error)
+            else: reducers[row].merge(reducer)
+
+        return [(None, None, errors[row]) if row in errors else
+                (*reducers[row].get_points(), None) for row in range(len(strings))]
+
+    def run_tasks(self, function, tasks, progress, cancelled):
+        executor = self.get_executor()
+        pending = [executor.submit(function, task) for task in tasks]
+        done = []
+        for future in futures.as_completed(pending):
+            done.append(future.result())
+            if progress: progress(len(done), len(pending))
+            if cancelled and cancelled():
+                return self.abort(pending)
+        return done
+
+    def abort(self, pending):
+        # Running tasks can't be cancelled: wait for them, so none outlives the job
+        for future in pending: future.cancel()
+        futures.wait(pending)
+        return None
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
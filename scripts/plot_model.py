@@ -0,0 +1,105 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"Keep the axes and lines alive between plots, re-evaluating only what changed"
+
+from viewport import curve_class, DatasetCurve
+from composition import EMPTY_TABLE
+
+class PlotEntry:
+    def __init__(self, fingerprint, curve):
+        self.fingerprint = fingerprint
+        self.curve = curve
+
+class PlotModel:
+    def __init__(self, main_layout, viewport, crosshair):
+        self.main_layout = main_layout
+        self.viewport = viewport
+        self.crosshair = crosshair
+        self.reset()
+
+    def reset(self):
+        # To be called after the figure has been cleared
+        self.ax = None
+        self.entries = {}
+        self.datasets = {}
+
+    def get_ax(self):
+        if self.ax is None:
+            self.ax = self.main_layout.get_ax()
+            self.viewport.watch(self.ax)
+            self.crosshair.watch(self.ax)
+        return self.ax
+
+    def select_dirty(self, compiled, get_fingerprint):
+        # Forget the functions which are gone, return the ones to evaluate
+        for app_func in set(self.entries) - {f for f, _ in compiled}:
+            self.remove(app_func)
+
+        return [(app_func, string) for app_func, string in compiled
+                if self.get_fingerprint(app_func) != get_fingerprint(string)]
+
+    def get_fingerprint(self, app_func):
+        entry = self.entries.get(app_func)
+        return entry.fingerprint if entry else None
+
+    def update(self, app_func, fingerprint, xs, ys, string, table=EMPTY_TABLE):
+        # Artists are reused while the kind of curve stays the same
+        kind = curve_class(xs, ys)
+        entry = self.entries.get(app_func)
+        if entry and type(entry.curve) is not kind:
+            self.remove(app_func)
+            entry = None
+
+        artist = entry.curve.line if entry else kind.create_artist(self.get_ax(), xs, ys)
+        artist.set_animated(True)
+        curve = kind(string, artist, xs, ys, table)
+        if entry: curve.restore()
+        self.entries[app_func] = PlotEntry(fingerprint, curve)
+
+    def remove(self, app_func):
+        entry = self.entries.pop(app_func, None)
+        if entry: entry.curve.line.remove()
+
+    def set_dataset(self, app_dataset, dataset, xs, ys):
+        # xs and ys are the dataset decimated on its whole x range
+        self.remove_dataset(app_dataset)
+        line = self.get_ax().plot(xs, ys, animated=True)[0]
+        self.datasets[app_dataset] = DatasetCurve(dataset, line, xs, ys)
+
+    def remove_dataset(self, app_dataset):
+        curve = self.datasets.pop(app_dataset, None)
+        if curve: curve.line.remove()
+
+    def get_named_curves(self):
+        return ([(app_func.get_name(), entry.curve) for app_func, entry in self.entries.items()] +
+                [(app_dataset.get_name(), curve) for app_dataset, curve in self.datasets.items()])
+
+    def get_curves(self):
+        return ([entry.curve for entry in self.entries.values()] +
+                list(self.datasets.values()))
+
+    def autoscale(self):
+        # Zoomed curves hold resampled data: limits come from the plotted ones
+        for curve in self.get_curves():
+            curve.restore()
+
+        ax = self.get_ax()
+        ax.relim()
+        for curve in self.get_curves():
+            curve.update_limits(ax)
+        ax.autoscale_view()
@@ -0,0 +1,157 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"Read, write and evaluate project files, without any GUI"
+
+import os
+
+import func_generator
+from grid import build_x
+from composition import FunctionTable
+from sweep import is_range, parse_parameters
+from implicit import QuadtreeSampler, is_2d, surface_budget
+
+X_SETTINGS_NAMES = ("start", "end", "n_points")
+DEFAULT_X_SETTINGS = (0.0, 100.0, 1000)
+
+# Where 2-D functions are evaluated on the y axis
+Y_RANGE_NAMES = ("y_start", "y_end")
+DEFAULT_Y_RANGE = (0.0, 100.0)
+
+# Imported datasets are saved as references: one "dataset=filename" line each
+DATASET_NAME = "dataset"
+
+# Parameters are saved as "param name=range" lines, even empty or half typed
+PARAM_PREFIX = "param "
+
+class InvalidProjectError(Exception):
+    def __init__(self, line):
+        Exception.__init__(self, line)
+        self.line = line
+
+class Project:
+    def __init__(self, funcs=None, x_settings=DEFAULT_X_SETTINGS, params=None,
+                 y_range=DEFAULT_Y_RANGE, datasets=None):
+        # funcs and params are lists of (name, expression or range) couples
+        self.funcs = funcs if funcs is not None else []
+        self.x_settings = tuple(x_settings)
+        self.params = params if params is not None else []
+        self.y_range = tuple(y_range)
+        self.datasets = datasets if datasets is not None else []
+
+    def set_x_setting(self, name, context):
+        x_settings = list(self.x_settings)
+        index = X_SETTINGS_NAMES.index(name)
+        x_settings[index] = int(context) if name == "n_points" else float(context)
+        self.x_settings = tuple(x_settings)
+
+    def set_y_setting(self, name, context):
+        y_range = list(self.y_range)
+        y_range[Y_RANGE_NAMES.index(name)] = float(context)
+        self.y_range = tuple(y_range)
+
+    def create_x(self):
+        return build_x(*self.x_settings)
+
+def parse_line(project, line):
+    name, sep, context = line.partition("=")
+    if not sep:
+        raise InvalidProjectError(line.rstrip("\n"))
+
+    name, context = name.strip(), context.strip()
+    try:
+        if name in X_SETTINGS_NAMES:
+            project.set_x_setting(name, context)
+        elif name in Y_RANGE_NAMES:
+            project.set_y_setting(name, context)
+        elif name == DATASET_NAME:
+            project.datasets.append(context)
+        elif name.startswith(PARAM_PREFIX):
+            project.params.append((name[len(PARAM_PREFIX):].strip(), context))
+        elif is_range(context):
+            # Files written before PARAM_PREFIX
+            project.params.append((name, context))
+        else:
+            project.funcs.append((name, context))
+    except ValueError:
+        raise InvalidProjectError(line.rstrip("\n"))
+
+def parse_project(lines):
+    project = Project()
+    for line in lines:
+        if line.strip():
+            parse_line(project, line)
+
+    return project
+
+def read_project(filename):
+    with open(filename) as file:
+        return parse_project(file)
+
+def format_project(project):
+    context = ""
+    for name, expression in project.funcs:
+        context += name + "=" + expression + "\n"
+
+    for name, text in project.params:
+        context += PARAM_PREFIX + name + "=" + text + "\n"
+
+    for name, value in zip(X_SETTINGS_NAMES, project.x_settings):
+        context += name + "=" + str(value) + "\n"
+
+    for name, value in zip(Y_RANGE_NAMES, project.y_range):
+        context += name + "=" + str(value) + "\n"
+
+    for filename in project.datasets:
+        context += DATASET_NAME + "=" + filename + "\n"
+    return context
+
+def write_project(filename, project):
+    with open(filename, "w") as file:
+        file.write(format_project(project))
+
+def evaluate_project(project):
+    # A (name, xs, ys, error) tuple for every non empty function
+    xs = project.create_x()
+    try:
+        table = FunctionTable(project.funcs, parse_parameters(project.params))
+    except ValueError as error:
+        return [(name, xs, None, error) for name, expression in project.funcs if expression]
+
+    results, memo = [], {}
+    for name, expression in project.funcs:
+        if not expression: continue
+
+        try:
+            results.append((name, *evaluate_row(project, table, expression, xs, memo), None))
+        except func_generator.FUNCS_EXECUTION_ERRORS as error:
+            results.append((name, xs, None, error))
+
+    return results
+
+def evaluate_row(project, table, expression, xs, memo):
+    # The (xs, ys) of a curve, a family, or a 2-D function
+    if is_2d(expression):
+        start, end, n_points = project.x_settings
+        sampler = QuadtreeSampler(expression, (start, end), project.y_range, table)
+        return sampler.plot(surface_budget(n_points))
+
+    return xs, table.evaluate(expression, xs, memo)
+
+def dataset_path(project_filename, filename):
+    # Relative references are relative to the project file
+    return os.path.join(os.path.dirname(os.path.abspath(project_filename)), filename)
@@ -0,0 +1,105 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"""Parameter sweeps: families of curves like sin(a*x) for 50 values of a.
+
+A parameter has a start:end:count range. A function using parameters is
+evaluated in one broadcasted pass over (parameter values × x): x is
+broadcast to a (rows, n) array and every parameter is a (rows, 1) column
+of the cartesian product of the ranges. The result has one row per curve.
+"""
+
+import numpy
+
+from compiler import SANDBOX_NAMES
+
+COLORMAP = "viridis"
+
+class Parameter:
+    def __init__(self, name, start, end, count):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.count = count
+
+    def values(self):
+        return numpy.linspace(self.start, self.end, self.count)
+
+    def format_range(self):
+        return f"{self.start}:{self.end}:{self.count}"
+
+def is_range(text):
+    return ":" in text
+
+def parse_parameter(name, text):
+    # ("a", "0:10:50") -> Parameter("a", 0.0, 10.0, 50)
+    name = name.strip()
+    if not name.isidentifier() or name in SANDBOX_NAMES:
+        raise ValueError(f"{name!r} can't be the name of a parameter")
+
+    try:
+        start, end, count = text.split(":")
+        parameter = Parameter(name, float(start), float(end), int(count))
+    except ValueError:
+        raise ValueError(f"the range of {name} must be start:end:count") from None
+
+    if parameter.count < 1:
+        raise ValueError(f"{name} needs at least one value")
+    return parameter
+
+def parse_parameters(params):
+    # params is a list of (name, range) couples
+    return [parse_parameter(name, text) for name, text in params]
+
+def make_columns(parameters):
+    grids = numpy.meshgrid(*[p.values() for p in parameters], indexing="ij")
+    return {p.name: grid.reshape(-1, 1) for p, grid in zip(parameters, grids)}
+
+def n_rows(columns):
+    return len(next(iter(columns.values())))
+
+def iter_rows(columns):
+    # The same product, as one {name: value} dict per row
+    for row in range(n_rows(columns)):
+        yield {name: float(column[row, 0]) for name, column in columns.items()}
+
+def segments(xs, ys):
+    return numpy.stack((numpy.broadcast_to(xs, ys.shape), ys), axis=-1)
+
+def data_limits(xs, ys):
+    # The corners of the finite samples, for Axes.update_datalim
+    finite = numpy.isfinite(ys)
+    if not finite.any(): return numpy.empty((0, 2))
+
+    xs = numpy.broadcast_to(xs, ys.shape)[finite]
+    ys = ys[finite]
+    return [(xs.min(), ys.min()), (xs.max(), ys.max())]
+
+def set_family_data(collection, xs, ys):
+    collection.set_segments(segments(xs, ys))
+    collection.set_array(numpy.linspace(0, 1, len(ys)))
+
+def add_family(ax, xs, ys, **kwargs):
+    # One LineCollection for the whole family, colored by row
+    from matplotlib.collections import LineCollection
+
+    collection = LineCollection([], cmap=COLORMAP, **kwargs)
+    set_family_data(collection, xs, ys)
+    ax.add_collection(collection, autolim=False)
+    ax.update_datalim(data_limits(xs, ys))
+    ax.autoscale_view()
+    return collection
@@ -0,0 +1,232 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"Re-evaluate the curves on the visible x interval when zooming or panning"
+
+from collections import OrderedDict
+
+import numpy
+from PySide2 import QtCore
+
+import func_generator
+import analysis
+from workers import ResampleJob
+from composition import EMPTY_TABLE
+from sweep import add_family, set_family_data, data_limits
+import implicit
+from implicit import add_heatmap, set_heatmap_data, heatmap_limits, is_2d
+
+SAMPLES_PER_PIXEL = 2
+DEBOUNCE_MS = 150
+CACHE_SIZE = 64
+
+class Curve:
+    # A Line2D, with the samples it was plotted with
+    def __init__(self, string, line, xs, ys, table=EMPTY_TABLE):
+        self.string = string
+        self.line = line
+        self.table = table
+        self.xs, self.ys = xs, ys
+
+    @staticmethod
+    def create_artist(ax, xs, ys):
+        return ax.plot(xs, ys)[0]
+
+    def set_data(self, xs, ys):
+        self.line.set_data(xs, ys)
+
+    def restore(self):
+        self.set_data(self.xs, self.ys)
+
+    def update_limits(self, ax):
+        # Axes.relim() already knows the lines
+        pass
+
+    def n_visible(self, lims):
+        return numpy.count_nonzero((self.xs >= lims[0]) & (self.xs <= lims[1]))
+
+    def zoomed_lims(self, lims):
+        # The visible part of the samples, None unless it is narrower than
+        # them: autoscaling shows them all, with margins
+        if not len(self.xs): return None
+        start, end = float(numpy.nanmin(self.xs)), float(numpy.nanmax(self.xs))
+        view = max(lims[0], start), min(lims[1], end)
+        if view[0] >= view[1] or view == (start, end): return None
+        return view
+
+    def is_resampled(self):
+        return not is_2d(self.string)
+
+    def get_key(self):
+        return self.table.signature(self.string)
+
+    def sample(self, lims, n_points):
+        xs = numpy.linspace(*lims, n_points)
+        return xs, self.table.evaluate(self.string, xs)
+
+    def value_at(self, x, y):
+        # What the crosshair shows for this curve: None for nothing
+        if is_2d(self.string): return None
+        return self.evaluate_point(lambda: self.table.evaluate(self.string, numpy.array([x])))
+
+    def analyze(self):
+        # Roots, extrema and integral; None for the curves which have none
+        if is_2d(self.string): return None
+        return analysis.analyze(self.xs, self.ys,
+                                lambda xs: self.table.evaluate(self.string, xs))
+
+    def evaluate_point(self, evaluate):
+        try:
+            return float(evaluate()[0])
+        except func_generator.FUNCS_EXECUTION_ERRORS:
+            return numpy.nan
+
+class FamilyCurve(Curve):
+    # A family of curves, drawn by one LineCollection
+    create_artist = staticmethod(add_family)
+
+    def set_data(self, xs, ys):
+        set_family_data(self.line, xs, ys)
+
+    def update_limits(self, ax):
+        ax.update_datalim(data_limits(self.xs, self.ys))
+
+    def value_at(self, x, y):
+        return None
+
+    def analyze(self):
+        return None
+
+class HeatmapCurve(Curve):
+    # The leaf cells of a z = f(x, y) quadtree: xs are their bounds
+    create_artist = staticmethod(add_heatmap)
+
+    def set_data(self, xs, ys):
+        set_heatmap_data(self.line, xs, ys)
+
+    def update_limits(self, ax):
+        ax.update_datalim(heatmap_limits(self.xs))
+
+    def value_at(self, x, y):
+        return self.evaluate_point(lambda: implicit.evaluate(
+            self.string, numpy.array([x]), numpy.array([y]), self.table))
+
+class DatasetCurve(Curve):
+    # Measured samples, decimated again on the visible x interval
+    def __init__(self, dataset, line, xs, ys):
+        Curve.__init__(self, dataset.filename, line, xs, ys)
+        self.dataset = dataset
+
+    def is_resampled(self):
+        return True
+
+    def get_key(self):
+        return self.dataset
+
+    def sample(self, lims, n_points):
+        return self.dataset.decimate(lims, n_points // SAMPLES_PER_PIXEL)
+
+    def analyze(self):
+        # There is no function to refine on, and the samples are decimated
+        return None
+
+    def value_at(self, x, y):
+        xs, ys = self.line.get_data()
+        return float(numpy.interp(x, xs, ys)) if len(xs) else None
+
+def curve_class(xs, ys):
+    if xs.ndim > 1: return HeatmapCurve
+    return FamilyCurve if ys.ndim > 1 else Curve
+
+class ViewportResampler:
+    # Curves are sampled again in the background, on zoomed in views only
+    def __init__(self, main_layout, thread_pool):
+        self.main_layout = main_layout
+        self.thread_pool = thread_pool
+        self.curves = []
+        self.cache = OrderedDict()
+        self.ax = None
+        self.job = None
+        self.jobs = set()
+
+        self.timer = QtCore.QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(DEBOUNCE_MS)
+        self.timer.timeout.connect(self.resample)
+
+    def watch(self, ax):
+        self.ax = ax
+        self.curves = []
+        ax.callbacks.connect("xlim_changed", lambda ax: self.timer.start())
+
+    def set_curves(self, curves):
+        self.curves = curves
+        self.cancel()
+
+    def cancel(self):
+        if self.job:
+            self.job.cancel()
+            self.job = None
+
+    def resample(self):
+        canvas = self.main_layout.get_canvas()
+        lims = tuple(sorted(self.ax.get_xlim()))
+        n_points = SAMPLES_PER_PIXEL * max(canvas.width(), 1)
+
+        tasks = [task for task in (self.update_curve(curve, lims, n_points)
+                                   for curve in self.curves) if task]
+        self.main_layout.get_blitter().update_curves()
+        self.cancel()
+        if tasks: self.start_job(tasks)
+
+    def update_curve(self, curve, lims, n_points):
+        # The plotted samples are kept unless the view zooms in on them, and
+        # while they are dense enough; the others are a task for the job
+        if not curve.is_resampled(): return None
+        view = curve.zoomed_lims(lims)
+        if view is None or curve.n_visible(view) >= n_points:
+            curve.restore()
+            return None
+
+        key = (curve.get_key(), view, n_points)
+        if key not in self.cache: return curve, view, n_points
+        self.cache.move_to_end(key)
+        curve.set_data(*self.cache[key])
+        return None
+
+    def start_job(self, tasks):
+        self.job = ResampleJob(tasks)
+        self.job.signals.finished.connect(self.job_finished)
+        self.jobs.add(self.job)
+        self.thread_pool.start(self.job)
+
+    def job_finished(self, job, results):
+        # Stale samples are cached still, only the current ones are drawn
+        self.jobs.discard(job)
+        for (curve, lims, n_points), samples in zip(job.tasks, results):
+            if samples is None: continue
+            self.store((curve.get_key(), lims, n_points), samples)
+            if job is self.job: curve.set_data(*samples)
+
+        if job is not self.job: return
+        self.job = None
+        self.main_layout.get_blitter().update_curves()
+
+    def store(self, key, samples):
+        self.cache[key] = samples
+        if len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
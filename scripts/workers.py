@@ -0,0 +1,366 @@
+#     This file is part of LDV-plotter.
+#
+#     LDV-plotter is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     LDV-plotter is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with LDV-plotter.  If not, see <https://www.gnu.org/licenses/>.
+
+# Copyright 2020-present Py-GNU-Unix <py.gnu.unix.moderator@gmail.com>
+
+"Background jobs, so the GUI thread never evaluates expressions"
+
+import contextlib
+
+import numpy
+from PySide2 import QtCore
+
+import func_generator
+from grid import build_x, x_chunks
+from adaptive import AdaptiveSampler
+from decimation import M4Reducer, DECIMATION_MIN_POINTS_PER_PIXEL
+from instrumentation import TRACER, Profiler
+from disk_cache import make_key
+from composition import EMPTY_TABLE
+from implicit import QuadtreeSampler, is_2d, surface_budget
+from project import DEFAULT_Y_RANGE
+from datasets import load_dataset
+
+class PlotJobSignals(QtCore.QObject):
+    # Every signal carries the job, so stale jobs can be recognized
+    progress = QtCore.Signal(object, int)
+    finished = QtCore.Signal(object, object)
+
+class PlotJob(QtCore.QRunnable):
+    def __init__(self, strings, xs, evaluator=None):
+        QtCore.QRunnable.__init__(self)
+        self.strings = strings
+        self.xs = xs
+        self.evaluator = evaluator
+        self.cancelled = False
+        self.profile_filename = None
+        self.cache = None
+        self.fingerprints = None
+        self.table = EMPTY_TABLE
+        self.y_range = DEFAULT_Y_RANGE
+        self.counts = {}
+        self.signals = PlotJobSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        # finished is always emitted: the GUI waits for it to plot again
+        try:
+            results = self.evaluate_counted()
+        except Exception as error:
+            # Like a MemoryError: every function of the job failed with it
+            results = [(None, None, error) for _ in self.strings]
+        self.signals.finished.emit(self, None if self.cancelled else results)
+
+    def evaluate_counted(self):
+        with self.get_profiler():
+            with TRACER.span("evaluate", functions=len(self.strings)):
+                results = self.evaluate_cached()
+
+        if results: self.count_results(results)
+        return results
+
+    def evaluate_cached(self):
+        if not self.cache: return self.evaluate_fresh()
+
+        # fingerprints are (signature, settings) couples, one per string
+        keys = [make_key(*fingerprint) for fingerprint in self.fingerprints]
+        cached = [self.cache.load(key) for key in keys]
+        results = self.evaluate_missing(cached)
+        if results is None: return None
+
+        for key, curve, (xs, ys, error) in zip(keys, cached, results):
+            if curve is None and error is None:
+                self.cache.store(key, xs, ys)
+        return results
+
+    def evaluate_missing(self, cached):
+        strings = [s for s, curve in zip(self.strings, cached) if curve is None]
+        fresh = self.evaluate_subset(strings, self.evaluate_fresh)
+        if fresh is None: return None
+        fresh = iter(fresh)
+        return [next(fresh) if curve is None else (*curve, None) for curve in cached]
+
+    def evaluate_subset(self, strings, evaluate):
+        saved = self.strings
+        self.strings = strings
+        try:
+            return evaluate() if strings else []
+        finally:
+            self.strings = saved
+
+    def evaluate_fresh(self):
+        # Families and 2-D functions are evaluated apart from the curves
+        kinds = [self.get_kind(string) for string in self.strings]
+        results = {}
+        for kind, evaluate in (("curve", self.evaluate_all),
+                               ("family", self.evaluate_families),
+                               ("surface", self.evaluate_surfaces)):
+            strings = [s for s, k in zip(self.strings, kinds) if k == kind]
+            results[kind] = self.evaluate_subset(strings, evaluate)
+            if results[kind] is None: return None
+
+        results = {kind: iter(done) for kind, done in results.items()}
+        return [next(results[kind]) for kind in kinds]
+
+    def get_kind(self, string):
+        if is_2d(string): return "surface"
+        return "family" if self.table.is_family(string) else "curve"
+
+    def evaluate_families(self):
+        xs = self.get_family_x()
+        results = self.evaluate_serial(xs)
+        if self.cancelled or results is None: return None
+        return [(xs, ys, error) for ys, error in results]
+
+    def get_family_x(self):
+        return self.xs
+
+    def get_x_settings(self):
+        return self.xs[0], self.xs[-1], len(self.xs) - 1
+
+    def evaluate_surfaces(self):
+        # In 2-D n_points is the evaluations budget, like in adaptive mode
+        start, end, n_points = self.get_x_settings()
+        results = []
+        for string in self.strings:
+            results.append(self.sample_surface(string, (start, end), surface_budget(n_points)))
+            self.report_progress(len(results), len(self.strings))
+            if self.cancelled: return None
+
+        return results
+
+    def sample_surface(self, string, x_range, max_evals):
+        sampler = QuadtreeSampler(string, x_range, self.y_range, self.table)
+        try:
+            xs, ys = sampler.plot(max_evals)
+        except func_generator.FUNCS_EXECUTION_ERRORS as error:
+            return None, None, error
+
+        self.counts[string] = {"evaluations": sampler.evaluations,
+                               "nans": sampler.nans, "cells": sampler.n_cells}
+        return xs, ys, None
+
+    def get_profiler(self):
+        if self.profile_filename:
+            return Profiler(self.profile_filename)
+        return contextlib.nullcontext()
+
+    def count_results(self, results):
+        for string, (xs, ys, error) in zip(self.strings, results):
+            if error is None:
+                counts = self.counts.get(string) or self.count_samples(xs, ys)
+                TRACER.count_func(string, **counts)
+
+    def count_samples(self, xs, ys):
+        nans = int(numpy.count_nonzero(numpy.isnan(ys)))
+        return {"evaluations": self.count_evaluations(xs, ys), "nans": nans}
+
+    def count_evaluations(self, xs, ys):
+        return ys.size if ys.ndim > 1 else len(xs)
+
+    def evaluate_all(self):
+        # Every result is a (xs, ys, error) tuple. Uniform grids are a few
+        # points per pixel column: larger ones are streamed in parallel
+        results = self.evaluate_serial(self.xs)
+        if self.cancelled or results is None: return None
+        return [(self.xs, ys, error) for ys, error in results]
+
+    def is_parallel(self, n_points):
+        return self.evaluator and self.evaluator.is_worth(len(self.strings), n_points)
+
+    def evaluate_serial(self, xs):
+        # Chunk by chunk, so functions called by others are evaluated once
+        ys = [numpy.empty(self.table.shape(string, len(xs))) for string in self.strings]
+        errors = [None for _ in self.strings]
+        for start in range(0, len(xs), func_generator.CHUNK_SIZE):
+            chunk = xs[start:start+func_generator.CHUNK_SIZE]
+            self.evaluate_chunk(chunk, ys, errors, start)
+            self.report_progress(start + len(chunk), len(xs))
+            if self.cancelled: return None
+
+        return [(None, error) if error else (y, None) for y, error in zip(ys, errors)]
+
+    def evaluate_chunk(self, chunk, ys, errors, start):
+        memo = {}
+        for index, string in enumerate(self.strings):
+            if errors[index]: continue
+            try:
+                ys[index][..., start:start+len(chunk)] = self.table.evaluate(string, chunk, memo)
+            except func_generator.FUNCS_EXECUTION_ERRORS as error:
+                errors[index] = error
+
+    def report_progress(self, done, total):
+        self.signals.progress.emit(self, int(100 * done / max(total, 1)))
+
+class AdaptivePlotJob(PlotJob):
+    def __init__(self, strings, x_settings, height_px):
+        PlotJob.__init__(self, strings, None)
+        self.x_settings = x_settings
+        self.height_px = height_px
+
+    def evaluate_all(self):
+        results = []
+        for string in self.strings:
+            results.append(self.sample(string))
+            self.report_progress(len(results), len(self.strings))
+            if self.cancelled: return None
+
+        return results
+
+    def get_family_x(self):
+        return build_x(*self.x_settings)
+
+    def get_x_settings(self):
+        return self.x_settings
+
+    def sample(self, string):
+        # In adaptive mode n_points is the evaluations budget
+        start, end, n_points = self.x_settings
+        sampler = AdaptiveSampler(string, self.height_px, table=self.table)
+        try:
+            return (*sampler.sample(start, end, n_points + 1), None)
+
+        except func_generator.FUNCS_EXECUTION_ERRORS as error:
+            return None, None, error
+
+class StreamingPlotJob(PlotJob):
+    # Never holds more than a chunk of samples: curves come out M4-decimated
+    def __init__(self, strings, x_settings, width, evaluator=None):
+        PlotJob.__init__(self, strings, None, evaluator)
+        self.x_settings = x_settings
+        self.width = width
+
+    def count_evaluations(self, xs, ys):
+        if ys.ndim > 1: return ys.size
+        return self.x_settings[2] + 1
+
+    def get_x_settings(self):
+        return self.x_settings
+
+    def get_family_x(self):
+        # Families are not decimated: a few samples per pixel column are enough
+        start, end, n_points = self.x_settings
+        return build_x(start, end, min(n_points, DECIMATION_MIN_POINTS_PER_PIXEL * self.width))
+
+    def evaluate_all(self):
+        n_points = self.x_settings[2] + 1
+        if self.is_parallel(n_points):
+            return self.evaluator.evaluate_decimated(
+                self.strings, self.x_settings, self.width, self.table,
+                self.report_progress, lambda: self.cancelled)
+
+        return self.decimate_all(n_points)
+
+    def decimate_all(self, n_points):
+        start, end, _ = self.x_settings
+        reducers = [M4Reducer(start, end, self.width) for _ in self.strings]
+        errors = [None for _ in self.strings]
+        for first, xs in x_chunks(*self.x_settings):
+            self.decimate_chunk(xs, reducers, errors)
+            self.report_progress(first + len(xs), n_points)
+            if self.cancelled: return None
+
+        return [(None, None, error) if error else (*reducer.get_points(), None)
+                for reducer, error in zip(reducers, errors)]
+
+    def decimate_chunk(self, xs, reducers, errors):
+        memo = {}
+        for index, string in enumerate(self.strings):
+            if errors[index]: continue
+            try:
+                reducers[index].add(xs, self.table.evaluate(string, xs, memo))
+            except func_generator.FUNCS_EXECUTION_ERRORS as error:
+                errors[index] = error
+
+class DatasetJob(QtCore.QRunnable):
+    # Maps or parses a dataset, then decimates it on its whole x range
+    def __init__(self, filename, width):
+        QtCore.QRunnable.__init__(self)
+        self.filename = filename
+        self.width = width
+        self.signals = PlotJobSignals()
+
+    def run(self):
+        with TRACER.span("load dataset", file=self.filename):
+            try:
+                dataset = load_dataset(self.filename)
+                result = (dataset, *dataset.decimate(dataset.x_range, self.width), None)
+            except Exception as error:
+                # InvalidDatasetError mostly, like a MemoryError on huge files
+                result = (None, None, None, error)
+
+        self.signals.finished.emit(self, result)
+
+class ResampleJob(QtCore.QRunnable):
+    # Samples curves on the zoomed x interval: tasks are (curve, lims,
+    # n_points) tuples, results their (xs, ys) samples, None if failed
+    def __init__(self, tasks):
+        QtCore.QRunnable.__init__(self)
+        self.tasks = tasks
+        self.cancelled = False
+        self.signals = PlotJobSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        results = []
+        with TRACER.span("resample", curves=len(self.tasks)):
+            for curve, lims, n_points in self.tasks:
+                if self.cancelled: break
+                results.append(self.sample(curve, lims, n_points))
+
+        self.signals.finished.emit(self, results)
+
+    def sample(self, curve, lims, n_points):
+        try:
+            return curve.sample(lims, n_points)
+        except Exception:
+            # The plotted samples stay: failures were reported when plotting
+            return None
+
+class ExportJobSignals(QtCore.QObject):
+    # The rows written, of how many, in how many seconds
+    progress = QtCore.Signal(object, int, int, float)
+    finished = QtCore.Signal(object, object)
+
+class ExportJob(QtCore.QRunnable):
+    # Streams the samples of an Exporter to a file, chunk by chunk
+    def __init__(self, exporter, filename, fmt):
+        QtCore.QRunnable.__init__(self)
+        self.exporter = exporter
+        self.filename = filename
+        self.fmt = fmt
+        self.signals = ExportJobSignals()
+        exporter.report = self.report_progress
+
+    def cancel(self):
+        self.exporter.cancel()
+
+    def run(self):
+        with TRACER.span("export", file=self.filename, format=self.fmt):
+            try:
+                self.exporter.export(self.filename, self.fmt)
+                error = None
+            except Exception as failure:
+                # OSError mostly, anything else is reported the same way
+                error = failure
+
+        self.signals.finished.emit(self, error)
+
+    def report_progress(self, rows, total, seconds):
+        self.signals.progress.emit(self, rows, total, seconds)